@@ -0,0 +1,57 @@
+import os, json
+
+from manifest import hash_file
+from files import save_json
+from sync import discover_files
+
+ASSET_CACHE_PATH = os.path.join('.build', 'assets.json')
+# pages and files fetched by fixed name (favicon.ico, robots.txt) keep their names
+FINGERPRINT_EXTENSIONS = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.avif', '.woff', '.woff2', '.ttf')
+HASH_LENGTH = 10
+
+def fingerprinted_name(path, digest):
+    root, extension = os.path.splitext(path)
+    return f'{root}.{digest[:HASH_LENGTH]}{extension}'
+
+def site_path(path, dir):
+    return os.path.relpath(path, dir).replace(os.sep, '/')
+
+class AssetMap:
+    # names derive from content alone, so an unchanged file keeps its name from build to build;
+    # hashes are cached by size and mtime so unchanged files are not read again
+    def __init__(self, static_dir, cache_path=ASSET_CACHE_PATH):
+        self.static_dir = static_dir
+        self.cache_path = cache_path
+        self.names = {}
+
+    def build(self):
+        cache = self.load_cache()
+        entries = {}
+        for source, _ in discover_files(self.static_dir, self.static_dir):
+            if not source.lower().endswith(FINGERPRINT_EXTENSIONS):
+                continue
+            path = site_path(source, self.static_dir)
+            stat = os.stat(source)
+            entry = cache.get(path)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': hash_file(source)}
+            entries[path] = entry
+            self.names[path] = fingerprinted_name(path, entry['hash'])
+        self.save_cache(entries)
+        return self.names
+
+    def rename(self, source, dest):
+        name = self.names.get(site_path(source, self.static_dir))
+        if name is None:
+            return dest
+        return os.path.join(os.path.dirname(dest), os.path.basename(name))
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, entries):
+        save_json(self.cache_path, entries)
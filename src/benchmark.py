@@ -0,0 +1,300 @@
+import os, sys, re, io, json, time, shlex, timeit, argparse, resource, tempfile, subprocess, tracemalloc, random
+from contextlib import redirect_stdout
+
+import main as site
+from markdown_blocks import block_to_block_type, BlockType, markdown_to_html_node, markdown_to_document, set_block_memo_size, block_memo_info
+from textnode import TextNode, TextType, text_to_textnodes
+from htmlnode import LeafNode
+from corpus import synthetic_page, small_post, link_heavy_page, code_heavy_page, generate_corpus
+
+RESULTS_PATH = os.path.join('.build', 'bench', 'results.jsonl')
+
+def legacy_block_to_block_type(markdown):
+    # block_to_block_type as it was before classification moved to anchored prefixes
+    lines = markdown.split('\n')
+
+    if len(re.findall(r'#{1,6} .*', markdown)) != 0:
+        return BlockType.HEADING
+    elif len(re.findall(r'```[\S\s]*```', markdown)) != 0:
+        return BlockType.CODE
+    elif len(re.findall(r'>.*', markdown)) != 0:
+        for line in lines:
+            if not line.startswith('>'):
+                return BlockType.PARAGRAPH
+        return BlockType.QUOTE
+    elif len(re.findall(r'- .*', markdown)) != 0:
+        for line in lines:
+            if not line.startswith('-'):
+                return BlockType.PARAGRAPH
+        return BlockType.UNORDERED_LIST
+    elif len(re.findall(r'1\. .*', markdown)) != 0:
+        i = 1
+        for line in lines:
+            if not line.startswith(f'{i}. '):
+                return BlockType.PARAGRAPH
+            i += 1
+        return BlockType.ORDERED_LIST
+    else:
+        return BlockType.PARAGRAPH
+
+class DictTextNode:
+    # TextNode without __slots__, for comparing per-instance memory
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictLeafNode:
+    # LeafNode without __slots__, for comparing per-instance memory
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+def bytes_per_instance(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list itself holds one pointer per node
+    return (after - before) / len(nodes) - 8
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# renders one synthetic page in a fresh interpreter and prints its peak RSS in KiB; with "dict", htmlnode and
+# textnode are loaded with their __slots__ lines removed first, so every node carries a __dict__ as before user-008.
+# Linux carries ru_maxrss over from the parent into a child, so VmHWM, which starts afresh at exec, is read where it exists.
+RENDER_RSS_SCRIPT = '''
+import sys, re, types, resource
+if sys.argv[1] == 'dict':
+    for name in ('htmlnode', 'textnode'):
+        module = types.ModuleType(name)
+        module.__file__ = name + '.py'
+        sys.modules[name] = module
+        with open(module.__file__) as file:
+            exec(compile(re.sub(r'(?m)^ *__slots__ = .*\\n', '', file.read()), module.__file__, 'exec'), module.__dict__)
+from corpus import synthetic_page
+from markdown_blocks import markdown_to_html_node
+markdown_to_html_node(synthetic_page(int(sys.argv[2]))).to_html()
+try:
+    with open('/proc/self/status') as file:
+        print(next(line.split()[1] for line in file if line.startswith('VmHWM:')))
+except OSError:
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+def render_peak_rss_mb(nodes, sections):
+    # nodes is 'slots' or 'dict'
+    result = subprocess.run([sys.executable, '-c', RENDER_RSS_SCRIPT, nodes, str(sections)], cwd=SRC_DIR, capture_output=True,
+                            text=True, check=True)
+    return int(result.stdout) / 1024
+
+def best_time(func, number, repeat=5):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def report(results, name, seconds, baseline=None):
+    results[name] = seconds
+    line = f'{name:<40} {seconds * 1e6:>12.2f} us'
+    if baseline is not None:
+        line += f'  ({baseline / seconds:.1f}x faster)'
+    print(line)
+
+def report_rate(results, name, value, unit):
+    results[name] = value
+    print(f'{name:<40} {value:>12.1f} {unit}')
+
+def bench_block_types(args):
+    results = {}
+    size = args.size
+    sentence = 'Plain words with a C# mention, a - dash, a > sign and 1. number ```inline``` here. '
+    paragraph = '\n'.join([sentence] * size)
+    blocks = {
+        'paragraph': paragraph,
+        'quote': '\n'.join(['> ' + sentence] * size),
+        'unordered_list': '\n'.join(['- ' + sentence] * size),
+        'ordered_list': '\n'.join([f'{i}. {sentence}' for i in range(1, size + 1)]),
+    }
+    number = max(1, 2000 // size)
+    for name, block in blocks.items():
+        legacy = best_time(lambda: legacy_block_to_block_type(block), number)
+        current = best_time(lambda: block_to_block_type(block), number)
+        report(results, f'block_types.legacy_{name}', legacy)
+        report(results, f'block_types.{name}', current, legacy)
+    return results
+
+def bench_memory(args):
+    results = {}
+    markdown = synthetic_page(args.size * 10)
+    tracemalloc.start()
+    html = markdown_to_html_node(markdown).to_html()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results['memory.render_peak_bytes'] = peak
+    name = f'render {len(markdown) // 1024} KiB page'
+    print(f'{name:<40} {peak / 1024 / 1024:>8.1f} MiB traced peak')
+    # peak RSS only means something for a process that did nothing else, so each variant renders in its own
+    before = render_peak_rss_mb('dict', args.size * 10)
+    after = render_peak_rss_mb('slots', args.size * 10)
+    results['memory.render_peak_rss_mb'] = after
+    print(f'{name:<40} {before:>8.1f} -> {after:.1f} MiB peak RSS (without -> with __slots__)')
+    count = 100000
+    text = 'shared text'
+    node_kinds = [
+        ('TextNode', lambda i: TextNode(text, TextType.TEXT_PLAIN), lambda i: DictTextNode(text, TextType.TEXT_PLAIN)),
+        ('LeafNode', lambda i: LeafNode('b', text), lambda i: DictLeafNode('b', text)),
+    ]
+    for name, slotted, unslotted in node_kinds:
+        before = bytes_per_instance(unslotted, count)
+        after = bytes_per_instance(slotted, count)
+        results[f'memory.{name}_bytes'] = after
+        print(f'{name:<40} {before:>8.1f} -> {after:.1f} bytes per node (without -> with __slots__)')
+    return results
+
+def sample_pages(args):
+    rng = random.Random(0)
+    return {
+        'small_post': small_post(rng, 0),
+        'huge_page': synthetic_page(args.size * 10),
+        'link_heavy': link_heavy_page(rng, 0, 100),
+        'code_heavy': code_heavy_page(rng, 0),
+    }
+
+def bench_inline(args):
+    results = {}
+    rng = random.Random(0)
+    text = ' '.join(link_heavy_page(rng, 0, 100).split('\n\n')[1:])
+    seconds = best_time(lambda: text_to_textnodes(text), 3)
+    report(results, 'inline.text_to_textnodes_link_heavy', seconds)
+    report_rate(results, 'inline.chars_per_second', len(text) / seconds, 'chars/s')
+    return results
+
+def bench_parse(args):
+    results = {}
+    # repeated runs would only measure the block memo
+    memo_size = block_memo_info().maxsize
+    set_block_memo_size(0)
+    try:
+        for name, markdown in sample_pages(args).items():
+            report(results, f'parse.markdown_to_html_node_{name}', best_time(lambda: markdown_to_html_node(markdown), 3))
+            report(results, f'parse.markdown_to_document_{name}', best_time(lambda: markdown_to_document(markdown), 3))
+    finally:
+        set_block_memo_size(memo_size)
+    return results
+
+def bench_to_html(args):
+    results = {}
+    memo_size = block_memo_info().maxsize
+    # memoized blocks are pre-rendered, which would leave nothing to serialize
+    set_block_memo_size(0)
+    try:
+        for name, markdown in sample_pages(args).items():
+            node = markdown_to_html_node(markdown)
+            report(results, f'to_html.{name}', best_time(node.to_html, 3))
+    finally:
+        set_block_memo_size(memo_size)
+    return results
+
+def bench_build(args):
+    results = {}
+    build_args = shlex.split(args.build_args)
+    with tempfile.TemporaryDirectory() as root:
+        pages = generate_corpus(root, args.posts, args.huge, args.link_heavy, args.code_heavy, args.size * 10)
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            with redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                site.main(build_args)
+                seconds = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    print(f'built {pages} pages with main.py {args.build_args}'.rstrip())
+    report(results, 'build.seconds', seconds)
+    report_rate(results, 'build.pages_per_second', pages / seconds, 'pages/s')
+    return results
+
+BENCHMARKS = {
+    'block_types': bench_block_types,
+    'memory': bench_memory,
+    'inline': bench_inline,
+    'parse': bench_parse,
+    'to_html': bench_to_html,
+    'build': bench_build,
+}
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip() != '']
+
+def save_results(path, record):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as file:
+        file.write(json.dumps(record, sort_keys=True) + '\n')
+
+def find_baseline(records, ref):
+    for record in reversed(records):
+        if ref is None or (record['commit'] or '').startswith(ref):
+            return record
+    return None
+
+def compare_results(results, baseline):
+    print(f'\ncompared with {baseline["commit"]} ({baseline["timestamp"]})')
+    for name, value in results.items():
+        old = baseline['results'].get(name)
+        if old is None or old == 0:
+            continue
+        change = (value - old) / old
+        # rates improve upwards, everything else is a time or a size
+        better = change > 0 if name.endswith('_per_second') else change < 0
+        print(f'{name:<40} {change:>+8.1%} {"better" if better else "worse"}')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark.py')
+    parser.add_argument('names', nargs='*', help=f'benchmarks to run: {", ".join(BENCHMARKS)} (default: all)')
+    parser.add_argument('--size', type=int, default=200, help='lines per generated block; huge pages get 10x as many sections')
+    parser.add_argument('--posts', type=int, default=200, help='small posts in the synthetic build corpus')
+    parser.add_argument('--huge', type=int, default=2, help='huge pages in the synthetic build corpus')
+    parser.add_argument('--link-heavy', type=int, default=5, help='link-heavy pages in the synthetic build corpus')
+    parser.add_argument('--code-heavy', type=int, default=5, help='code-heavy pages in the synthetic build corpus')
+    parser.add_argument('--build-args', default='', help='arguments passed to main.py for the build benchmark')
+    parser.add_argument('--save', action='store_true', help=f'append the results to {RESULTS_PATH}')
+    parser.add_argument('--compare', nargs='?', const='', metavar='COMMIT',
+                        help='compare with the last saved run, or the last one for COMMIT')
+    parser.add_argument('--budget', type=float, metavar='PAGES_PER_SECOND',
+                        help='exit with an error if the build benchmark is slower than this')
+    parser.add_argument('--results', default=RESULTS_PATH, help='results file used by --save and --compare')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+
+    results = {}
+    for name in args.names or list(BENCHMARKS):
+        results.update(BENCHMARKS[name](args))
+
+    if args.compare is not None:
+        baseline = find_baseline(load_results(args.results), args.compare or None)
+        if baseline is None:
+            print('\nno saved results to compare with')
+        else:
+            compare_results(results, baseline)
+    if args.save:
+        record = {'commit': current_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args), 'results': results}
+        save_results(args.results, record)
+    if args.budget is not None and 'build.pages_per_second' in results:
+        if results['build.pages_per_second'] < args.budget:
+            print(f'\nbuild is below the budget of {args.budget} pages/s')
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
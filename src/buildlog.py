@@ -0,0 +1,82 @@
+import sys, json, time
+from collections import Counter
+
+QUIET = 0
+SUMMARY = 1
+VERBOSE = 2
+LEVELS = {'quiet': QUIET, 'summary': SUMMARY, 'verbose': VERBOSE}
+
+EVENT_BUFFER_BYTES = 1 << 20
+# redraw the progress counter at most this often
+PROGRESS_INTERVAL = 0.1
+
+class BuildLog:
+    def __init__(self, level=SUMMARY, events_path=None, stream=None):
+        self.level = level
+        self.stream = sys.stdout if stream is None else stream
+        self.events = None if events_path is None else open(events_path, 'w', buffering=EVENT_BUFFER_BYTES)
+        self.counts = Counter()
+        self.bytes = 0
+        self.start = time.perf_counter()
+        self.last_progress = 0.0
+        self.progress_shown = False
+
+    def event(self, kind, message=None, **fields):
+        self.counts[kind] += 1
+        self.bytes += fields.get('bytes', 0)
+        if self.events is not None:
+            record = {'t': round(time.perf_counter() - self.start, 6), 'event': kind}
+            record.update(fields)
+            self.events.write(json.dumps(record) + '\n')
+        if message is not None and self.level >= VERBOSE:
+            self.write(message)
+
+    def detail(self, message):
+        if self.level >= VERBOSE:
+            self.write(message)
+
+    def info(self, message):
+        if self.level >= SUMMARY:
+            self.write(message)
+
+    def progress(self, label, done, total):
+        # only interactive summary output gets a live counter; logs and pipes stay clean
+        if self.level != SUMMARY or not self.stream.isatty():
+            return
+        now = time.perf_counter()
+        if done != total and now - self.last_progress < PROGRESS_INTERVAL:
+            return
+        self.last_progress = now
+        self.stream.write(f'\r{label} {done}/{total}')
+        self.stream.flush()
+        self.progress_shown = True
+
+    def write(self, message):
+        if self.progress_shown:
+            self.stream.write('\n')
+            self.progress_shown = False
+        self.stream.write(message + '\n')
+
+    def summary_line(self):
+        elapsed = time.perf_counter() - self.start
+        parts = [f"{self.counts['page'] + self.counts['identical']} pages rendered"]
+        for kind, label in (('identical', 'identical to existing output'), ('static', 'static files copied'), ('generated', 'index files generated'), ('compressed', 'files compressed'), ('unchanged', 'unchanged'), ('removed', 'removed')):
+            if self.counts[kind] != 0:
+                parts.append(f'{self.counts[kind]} {label}')
+        return f'Built site: {", ".join(parts)}, {self.bytes / 1024 / 1024:.2f} MiB written in {elapsed:.2f} s'
+
+    def summary(self):
+        self.info(self.summary_line())
+
+    def close(self):
+        if self.events is not None:
+            self.events.close()
+            self.events = None
+
+log = BuildLog()
+
+def configure(level=SUMMARY, events_path=None, stream=None):
+    global log
+    log.close()
+    log = BuildLog(level, events_path, stream)
+    return log
@@ -0,0 +1,81 @@
+import os, json, shutil, hashlib
+
+from manifest import hash_bytes
+from files import save_json
+
+CACHE_DIR = os.path.join('.build', 'cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# entries are only valid for the parser that produced them
+PARSER_MODULES = ('markdown_blocks.py', 'textnode.py', 'htmlnode.py')
+CACHE_FORMAT = 3
+
+def parser_version():
+    digest = hashlib.sha256(f'format {CACHE_FORMAT}'.encode())
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in PARSER_MODULES:
+        with open(os.path.join(src_dir, name), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+class RenderCache:
+    def __init__(self, dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        self.root = dir
+        self.version = parser_version() if version is None else version
+        self.dir = os.path.join(dir, self.version)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.dir, exist_ok=True)
+
+    def key(self, markdown):
+        return hash_bytes(markdown.encode())
+
+    def entry_path(self, key):
+        return os.path.join(self.dir, key[:2], key + '.json')
+
+    def get(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # the mtime doubles as the last-used time for eviction
+        os.utime(path)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        save_json(self.entry_path(key), entry)
+
+    def remove_old_versions(self):
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name != self.version and os.path.isdir(path):
+                shutil.rmtree(path)
+                removed += 1
+        return removed
+
+    def evict(self):
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.dir):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def __repr__(self):
+        return f'RenderCache({self.dir}, hits: {self.hits}, misses: {self.misses})'
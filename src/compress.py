@@ -0,0 +1,62 @@
+import os, gzip
+from concurrent.futures import ThreadPoolExecutor
+
+from files import write_atomic
+
+# text formats only; images, fonts and archives are already compressed and would not shrink
+COMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.mjs', '.svg', '.xml', '.json', '.txt')
+GZIP_LEVEL = 9
+
+def compressible(path):
+    return path.lower().endswith(COMPRESS_EXTENSIONS)
+
+def gzip_path(path):
+    return path + '.gz'
+
+def is_fresh(path):
+    # a sibling written after its file still matches it
+    try:
+        return os.stat(gzip_path(path)).st_mtime_ns >= os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def remove_stale(path):
+    # a server preferring the .gz would otherwise keep serving the old content
+    try:
+        os.remove(gzip_path(path))
+    except FileNotFoundError:
+        pass
+
+def write_gzip(path, data=None):
+    # data is the file's content when the caller still holds it; otherwise the file is read back
+    if data is None:
+        with open(path, 'rb') as file:
+            data = file.read()
+    # a fixed mtime in the header keeps the output the same for the same input
+    compressed = gzip.compress(data, GZIP_LEVEL, mtime=0)
+    write_atomic(gzip_path(path), compressed)
+    return len(compressed)
+
+class Compressor:
+    # zlib releases the GIL, so a thread pool compresses on every core while the build goes on
+    def __init__(self, workers=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+        self.futures = []
+        self.skipped = 0
+
+    def submit(self, path, data=None, changed=True):
+        if not compressible(path):
+            return
+        if not changed and is_fresh(path):
+            self.skipped += 1
+            return
+        self.futures.append((path, self.executor.submit(write_gzip, path, data)))
+
+    def wait(self):
+        # returns (path, compressed size) for every sibling submitted since the last wait, in submission order
+        done = [(path, future.result()) for path, future in self.futures]
+        self.futures = []
+        return done
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,88 @@
+import os, sys, random, argparse
+
+from files import write_file
+
+WORDS = ('middle', 'earth', 'ring', 'elf', 'dwarf', 'hobbit', 'wizard', 'shire', 'river', 'mountain',
+         'forest', 'tower', 'sword', 'lore', 'song', 'road', 'king', 'star', 'shadow', 'light')
+
+TEMPLATE = '''<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+'''
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def synthetic_page(size):
+    sections = ['# Synthetic page']
+    for i in range(size):
+        sections.append(f'## Section {i}')
+        sections.append(f'Some **bold** text, some _italic_ text, `code {i}` and a [link](/blog/post{i}) with ![an image](/images/{i}.png).')
+        sections.append('\n'.join([f'- item {j} with [a link](/item/{j})' for j in range(5)]))
+        sections.append(f'> quoted line {i}\n> another quoted line')
+    return '\n\n'.join(sections)
+
+def small_post(rng, i):
+    blocks = [f'# Post {i}', '[< Back Home](/)', f'![cover](/images/cover{i % 4}.png)']
+    for _ in range(rng.randint(3, 8)):
+        blocks.append(f'{sentence(rng)} **{rng.choice(WORDS)}** {sentence(rng)} _{rng.choice(WORDS)}_ `{rng.choice(WORDS)}`')
+    blocks.append('\n'.join([f'- {sentence(rng, 6)}' for _ in range(4)]))
+    blocks.append('> ' + sentence(rng))
+    return '\n\n'.join(blocks)
+
+def link_heavy_page(rng, i, posts):
+    blocks = [f'# Links {i}']
+    for _ in range(200):
+        links = ' '.join(f'[{rng.choice(WORDS)}](/blog/post{rng.randrange(max(posts, 1))})' for _ in range(10))
+        blocks.append(f'See {links} and ![img](/images/cover{rng.randrange(4)}.png).')
+    return '\n\n'.join(blocks)
+
+def code_heavy_page(rng, i):
+    blocks = [f'# Code {i}']
+    for j in range(100):
+        blocks.append(f'Example {j} uses `{rng.choice(WORDS)}`:')
+        code = '\n'.join(f'print("{rng.choice(WORDS)}", {k})' for k in range(rng.randint(5, 30)))
+        blocks.append(f'```\n{code}\n```')
+    return '\n\n'.join(blocks)
+
+def generate_corpus(root, posts=200, huge=2, link_heavy=5, code_heavy=5, huge_size=2000, seed=0):
+    rng = random.Random(seed)
+    content = os.path.join(root, 'content')
+    write_file(os.path.join(root, 'template.html'), TEMPLATE)
+    write_file(os.path.join(root, 'static', 'index.css'), 'body { margin: 0; }\n')
+    for i in range(4):
+        write_file(os.path.join(root, 'static', 'images', f'cover{i}.png'), '\x89PNG' + 'x' * 1024)
+    index = ['# Synthetic site', '\n'.join([f'- [Post {i}](/blog/post{i})' for i in range(posts)])]
+    write_file(os.path.join(content, 'index.md'), '\n\n'.join(index))
+    for i in range(posts):
+        write_file(os.path.join(content, 'blog', f'post{i}', 'index.md'), small_post(rng, i))
+    for i in range(huge):
+        write_file(os.path.join(content, 'huge', f'page{i}', 'index.md'), synthetic_page(huge_size))
+    for i in range(link_heavy):
+        write_file(os.path.join(content, 'links', f'page{i}', 'index.md'), link_heavy_page(rng, i, posts))
+    for i in range(code_heavy):
+        write_file(os.path.join(content, 'code', f'page{i}', 'index.md'), code_heavy_page(rng, i))
+    return 1 + posts + huge + link_heavy + code_heavy
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='corpus.py', description='write a synthetic site (content/, static/, template.html)')
+    parser.add_argument('root')
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--huge', type=int, default=2)
+    parser.add_argument('--link-heavy', type=int, default=5)
+    parser.add_argument('--code-heavy', type=int, default=5)
+    parser.add_argument('--huge-size', type=int, default=2000, help='sections per huge page')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    pages = generate_corpus(args.root, args.posts, args.huge, args.link_heavy, args.code_heavy, args.huge_size, args.seed)
+    print(f'Wrote {pages} pages to {args.root}')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os, marshal
+
+from linkindex import output_url, resolve_reference
+from files import write_atomic
+
+GRAPH_PATH = os.path.join('.build', 'depgraph.bin')
+GRAPH_VERSION = 1
+# kinds of dependency whose change alters the dependent page's output; links only matter to the link check
+RENDER_KINDS = ('template', 'image')
+
+def normalize_target(target):
+    # a directory index is linked with or without the trailing slash
+    return target if target == '/' else target.rstrip('/')
+
+class DependencyGraph:
+    # each page (keyed by output path) depends on its template, the images it shows and the pages it links to;
+    # templates are file paths, images and pages are site-root URLs
+    def __init__(self, public_dir):
+        self.public_dir = public_dir
+        self.pages = {}
+        self.reverse = None
+
+    def add_page(self, dest, source, template, references):
+        self.pages[dest] = (source, template, tuple(tuple(reference) for reference in references))
+        self.reverse = None
+
+    def remove_page(self, dest):
+        self.pages.pop(dest, None)
+        self.reverse = None
+
+    def references(self, dest):
+        return self.pages[dest][2]
+
+    def dependencies(self, dest):
+        source, template, references = self.pages[dest]
+        yield 'template', template
+        page_url = output_url(dest, self.public_dir)
+        for kind, url in references:
+            target = resolve_reference(page_url, url)
+            if target is not None:
+                yield kind, normalize_target(target)
+
+    def dependents(self, target, kinds=RENDER_KINDS):
+        if self.reverse is None:
+            # built on first query rather than persisted, so the file only holds what the pages refer to
+            self.reverse = {}
+            for dest in self.pages:
+                for kind, dependency in self.dependencies(dest):
+                    self.reverse.setdefault(dependency, set()).add((kind, dest))
+        return {dest for kind, dest in self.reverse.get(normalize_target(target), ()) if kind in kinds}
+
+    def stale(self, changed, kinds=RENDER_KINDS):
+        stale = set()
+        for target in changed:
+            stale |= self.dependents(target, kinds)
+        return stale
+
+    def affected(self, pages, changed, kinds=RENDER_KINDS):
+        # pages the graph has never seen may depend on anything, so they are always included
+        stale = self.stale(changed, kinds)
+        return [(source, dest) for source, dest in pages if dest in stale or dest not in self.pages]
+
+    def save(self, path=GRAPH_PATH):
+        # strings are stored once in a table and referred to by index; marshal loads that in one call
+        strings = {}
+        def index(string):
+            return strings.setdefault(string, len(strings))
+        pages = []
+        for dest, (source, template, references) in self.pages.items():
+            flat = []
+            for kind, url in references:
+                flat.append(index(kind))
+                flat.append(index(url))
+            pages.append((index(dest), index(source), index(template), tuple(flat)))
+        write_atomic(path, marshal.dumps((GRAPH_VERSION, tuple(strings), tuple(pages))))
+
+    @classmethod
+    def load(cls, path, public_dir):
+        graph = cls(public_dir)
+        try:
+            with open(path, 'rb') as file:
+                version, strings, pages = marshal.loads(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return graph
+        if version != GRAPH_VERSION:
+            return graph
+        for dest, source, template, flat in pages:
+            references = tuple((strings[flat[i]], strings[flat[i + 1]]) for i in range(0, len(flat), 2))
+            graph.pages[strings[dest]] = (strings[source], strings[template], references)
+        return graph
@@ -0,0 +1,27 @@
+import os, json
+
+def write_atomic(path, data):
+    # readers never see half a file: data goes to a temp file in the same directory, which then replaces path;
+    # the pid keeps worker processes writing the same path from sharing a temp file
+    dir = os.path.dirname(path)
+    if dir != '':
+        os.makedirs(dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def save_json(path, value, **options):
+    # options go to json.dumps, e.g. indent and sort_keys for files meant to be diffed
+    write_atomic(path, json.dumps(value, **options).encode())
+
+def write_file(path, data):
+    # plain write of text or bytes, creating the parent directories; for fixtures and generated corpora
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb' if isinstance(data, bytes) else 'w') as file:
+        file.write(data)
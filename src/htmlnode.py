@@ -1,4 +1,8 @@
+import io
+
 class HTMLNode:
+    __slots__ = ('tag', 'value', 'children', 'props')
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -7,19 +11,21 @@ class HTMLNode:
 
     def to_html(self):
         raise NotImplementedError('to_html method not implemented')
+
+    def write_html(self, file):
+        file.write(self.to_html())
     
     def props_to_html(self):
         if self.props is None:
             return ''
-        html = ''
-        for p in self.props:
-            html += f' {p}="{self.props[p]}"'
-        return html
+        return ''.join([f' {p}="{self.props[p]}"' for p in self.props])
     
     def __repr__(self):
         return f'HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})'
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -34,19 +40,41 @@ class LeafNode(HTMLNode):
         return f'LeafNode({self.tag}, {self.value}, children: {self.children}, {self.props})'
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
         
     def to_html(self):
+        buffer = io.StringIO()
+        self.write_html(buffer)
+        return buffer.getvalue()
+
+    def write_html(self, file):
         if self.tag is None:
             raise ValueError('tag is missing')
         if self.children is None:
             raise ValueError('children is missing')
-        html = f'<{self.tag}{self.props_to_html()}>'
+        file.write(f'<{self.tag}{self.props_to_html()}>')
         for child in self.children:
-            html += child.to_html()
-        html += f'</{self.tag}>'
-        return html
+            child.write_html(file)
+        file.write(f'</{self.tag}>')
+
+    def __repr__(self):
+        return f'ParentNode({self.tag}, {self.value}, children: {self.children}, {self.props})'
+
+class FragmentNode(HTMLNode):
+    __slots__ = ()
+
+    # a rendered subtree that is shared and never re-serialized; the tree stays inspectable as children[0]
+    def __init__(self, node):
+        super().__init__(None, node.to_html(), [node], None)
+
+    def to_html(self):
+        return self.value
+
+    def write_html(self, file):
+        file.write(self.value)
 
     def __repr__(self):
-        return f'ParentNode({self.tag}, {self.value}, children: {self.children}, {self.props})'
\ No newline at end of file
+        return f'FragmentNode({self.value}, children: {self.children})'
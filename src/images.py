@@ -0,0 +1,300 @@
+import os, json, zlib, struct, argparse
+from itertools import accumulate, chain, repeat
+from operator import add, sub, and_, floordiv, itemgetter
+
+from manifest import hash_file
+from files import save_json, write_atomic
+from sync import discover_files
+from assets import fingerprinted_name, site_path
+
+IMAGE_CACHE_PATH = os.path.join('.build', 'images.json')
+IMAGE_VARIANT_DIR = os.path.join('.build', 'images')
+IMAGE_CACHE_VERSION = 1
+IMAGE_EXTENSIONS = ('.png', '.gif', '.jpg', '.jpeg', '.webp')
+# enough for every header format here except JPEG, whose size comes after its other segments
+HEADER_BYTES = 32
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# bytes per pixel of 8-bit PNGs by colour type: grey, RGB, grey + alpha, RGBA
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+# start-of-frame markers carry the size; C4, C8 and CC share the range but are other segments
+JPEG_FRAME_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def parse_widths(value):
+    # "480,960"
+    try:
+        widths = tuple(int(part) for part in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected comma-separated widths, got {value!r}')
+    if any(width < 1 for width in widths):
+        raise argparse.ArgumentTypeError(f'widths must be positive: {value}')
+    return widths
+
+def png_size(header):
+    if header[:8] == PNG_SIGNATURE and header[12:16] == b'IHDR':
+        return struct.unpack('>II', header[16:24])
+    return None
+
+def gif_size(header):
+    if header[:6] in (b'GIF87a', b'GIF89a'):
+        return struct.unpack('<HH', header[6:10])
+    return None
+
+def webp_size(header):
+    if header[:4] != b'RIFF' or header[8:12] != b'WEBP':
+        return None
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+    return None
+
+def jpeg_size(file):
+    # walks the segment headers, seeking over their bodies, until the frame header
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) != 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] == 0xFF:
+            file.seek(-1, os.SEEK_CUR)
+            continue
+        length = file.read(2)
+        if len(length) != 2:
+            return None
+        if marker[1] in JPEG_FRAME_MARKERS:
+            frame = file.read(5)
+            if len(frame) != 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        file.seek(int.from_bytes(length, 'big') - 2, os.SEEK_CUR)
+
+def image_size(path):
+    # returns (width, height) from the file header alone, or None for formats it does not know
+    with open(path, 'rb') as file:
+        header = file.read(HEADER_BYTES)
+        if header[:2] == b'\xff\xd8':
+            return jpeg_size(file)
+    for read_size in (png_size, gif_size, webp_size):
+        size = read_size(header)
+        if size is not None:
+            return size
+    return None
+
+def unfilter_rows(data, width, height, bpp):
+    stride = width * bpp
+    rows = []
+    previous = bytes(stride)
+    position = 0
+    for _ in range(height):
+        kind = data[position]
+        line = data[position + 1:position + 1 + stride]
+        position += stride + 1
+        if kind == 0:
+            row = line
+        elif kind == 2:
+            row = bytes(map(and_, map(add, line, previous), repeat(0xFF)))
+        else:
+            row = bytearray(line)
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                if kind == 1:
+                    row[i] = (row[i] + left) & 0xFF
+                elif kind == 3:
+                    row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+                elif kind == 4:
+                    up = previous[i]
+                    up_left = previous[i - bpp] if i >= bpp else 0
+                    estimate = left + up - up_left
+                    distance_left = abs(estimate - left)
+                    distance_up = abs(estimate - up)
+                    distance_up_left = abs(estimate - up_left)
+                    if distance_left <= distance_up and distance_left <= distance_up_left:
+                        row[i] = (row[i] + left) & 0xFF
+                    elif distance_up <= distance_up_left:
+                        row[i] = (row[i] + up) & 0xFF
+                    else:
+                        row[i] = (row[i] + up_left) & 0xFF
+                else:
+                    raise ValueError(f'unknown PNG filter {kind}')
+            row = bytes(row)
+        rows.append(row)
+        previous = row
+    return rows
+
+def decode_png(data):
+    # returns (width, height, colour type, rows of raw pixel bytes) for 8-bit, non-interlaced PNGs
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError('not a PNG')
+    position = 8
+    chunks = []
+    header = None
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        body = data[position + 8:position + 8 + length]
+        position += length + 12
+        if kind == b'IHDR':
+            header = struct.unpack('>IIBBBBB', body)
+        elif kind == b'IDAT':
+            chunks.append(body)
+        elif kind == b'IEND':
+            break
+    if header is None:
+        raise ValueError('PNG has no header')
+    width, height, depth, colour, _, _, interlace = header
+    if depth != 8 or colour not in PNG_CHANNELS or interlace != 0:
+        raise ValueError('only 8-bit, non-interlaced, non-palette PNGs are resized')
+    rows = unfilter_rows(zlib.decompress(b''.join(chunks)), width, height, PNG_CHANNELS[colour])
+    return width, height, colour, rows
+
+def png_chunk(kind, body):
+    return struct.pack('>I', len(body)) + kind + body + struct.pack('>I', zlib.crc32(kind + body))
+
+def encode_png(width, height, colour, rows):
+    # rows are left unfiltered: on downscaled photographs zlib alone did better than the Up filter, and faster
+    data = b''.join(b'\x00' + row for row in rows)
+    header = struct.pack('>IIBBBBB', width, height, 8, colour, 0, 0, 0)
+    return PNG_SIGNATURE + png_chunk(b'IHDR', header) + png_chunk(b'IDAT', zlib.compress(data, 9)) + png_chunk(b'IEND', b'')
+
+def resize_rows(rows, width, height, channels, new_width, new_height):
+    # box filter: each output pixel is the mean of the source pixels it covers; the sums run as
+    # column totals and prefix-sum differences, so the per-pixel work stays inside C loops
+    lefts = [x * width // new_width for x in range(new_width)]
+    rights = [max(left + 1, (x + 1) * width // new_width) for x, left in enumerate(lefts)]
+    widths = [right - left for left, right in zip(lefts, rights)]
+    get_lefts = itemgetter(*lefts)
+    get_rights = itemgetter(*rights)
+    resized = []
+    for y in range(new_height):
+        top = y * height // new_height
+        bottom = max(top + 1, (y + 1) * height // new_height)
+        sums = list(map(sum, zip(*rows[top:bottom])))
+        counts = [box * (bottom - top) for box in widths]
+        planes = []
+        for channel in range(channels):
+            prefix = list(accumulate(sums[channel::channels], initial=0))
+            totals = map(sub, get_rights(prefix), get_lefts(prefix)) if new_width > 1 else [prefix[rights[0]] - prefix[lefts[0]]]
+            planes.append(map(floordiv, totals, counts))
+        resized.append(bytes(chain.from_iterable(zip(*planes))))
+    return resized
+
+def resize_png(data, widths):
+    # returns {width: png bytes} for each width narrower than the image; a variant that comes out
+    # no smaller than the original file saves nothing and is dropped
+    width, height, colour, rows = decode_png(data)
+    channels = PNG_CHANNELS[colour]
+    variants = {}
+    for new_width in widths:
+        if new_width < width:
+            new_height = max(1, round(height * new_width / width))
+            png = encode_png(new_width, new_height, colour, resize_rows(rows, width, height, channels, new_width, new_height))
+            if len(png) < len(data):
+                variants[new_width] = png
+    return variants
+
+def variant_path(path, width):
+    root, extension = os.path.splitext(path)
+    return f'{root}-{width}w{extension}'
+
+class ImageStage:
+    # dimensions and downscaled variants of every static image, cached by content hash so an image is only
+    # read again for widths it has not been resized to before; hashes are cached by size and mtime
+    def __init__(self, static_dir, widths=(), cache_path=IMAGE_CACHE_PATH, variant_dir=IMAGE_VARIANT_DIR):
+        self.static_dir = static_dir
+        self.widths = tuple(sorted(set(widths)))
+        self.cache_path = cache_path
+        self.variant_dir = variant_dir
+        # site path -> {'width', 'height', 'variants': [[width, site path], ...]}
+        self.attributes = {}
+        # (cached variant file, site path) for every variant to copy into the output
+        self.variants = []
+        self.processed = 0
+
+    def build(self, fingerprint=False):
+        cache = self.load_cache()
+        files = {}
+        images = {}
+        for source, _ in discover_files(self.static_dir, self.static_dir):
+            if not source.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = site_path(source, self.static_dir)
+            stat = os.stat(source)
+            entry = cache['files'].get(path)
+            if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': hash_file(source)}
+            files[path] = entry
+            digest = entry['hash']
+            image = self.process(source, digest, cache['images'].get(digest))
+            images[digest] = image
+            if image['width'] is None:
+                continue
+            variants = []
+            for width in self.widths:
+                if width not in image['variants']:
+                    continue
+                name = variant_path(path, width)
+                if fingerprint:
+                    name = fingerprinted_name(name, digest)
+                variants.append([width, name])
+                self.variants.append((self.variant_file(digest, width), name))
+            self.attributes[path] = {'width': image['width'], 'height': image['height'], 'variants': variants}
+        self.save_cache({'version': IMAGE_CACHE_VERSION, 'files': files, 'images': images})
+        self.prune_variants(images)
+        return self.attributes
+
+    def process(self, source, digest, image=None):
+        # image is the cached entry: its size, the widths already tried and the variants they produced
+        cached = image is not None
+        if not cached:
+            image = {'width': None, 'height': None, 'tried': [], 'variants': []}
+            size = image_size(source)
+            if size is not None:
+                image['width'], image['height'] = size
+        missing = [width for width in self.widths if width not in image['tried']
+                   or (width in image['variants'] and not os.path.exists(self.variant_file(digest, width)))]
+        if len(missing) == 0 or image['width'] is None or not source.lower().endswith('.png'):
+            self.processed += not cached
+            return image
+        self.processed += 1
+        with open(source, 'rb') as file:
+            data = file.read()
+        try:
+            variants = resize_png(data, missing)
+        except (ValueError, zlib.error):
+            # palette, 16-bit and interlaced PNGs keep their dimensions but get no variants
+            variants = {}
+        for width, png in variants.items():
+            # only whole variants ever exist, since a later build trusts any variant file it finds
+            write_atomic(self.variant_file(digest, width), png)
+        image = dict(image)
+        image['tried'] = sorted(set(image['tried']) | set(missing))
+        image['variants'] = sorted(set(image['variants']) - set(missing) | set(variants))
+        return image
+
+    def variant_file(self, digest, width):
+        return os.path.join(self.variant_dir, f'{digest}-{width}.png')
+
+    def prune_variants(self, images):
+        # variants of images that are gone or were replaced would otherwise pile up
+        keep = {self.variant_file(digest, width) for digest, image in images.items() for width in image['variants']}
+        for source, _ in discover_files(self.variant_dir, self.variant_dir):
+            if source not in keep:
+                os.remove(source)
+
+    def load_cache(self):
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            cache = {}
+        if cache.get('version') != IMAGE_CACHE_VERSION:
+            return {'version': IMAGE_CACHE_VERSION, 'files': {}, 'images': {}}
+        return cache
+
+    def save_cache(self, cache):
+        save_json(self.cache_path, cache)
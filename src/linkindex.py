@@ -0,0 +1,59 @@
+import os, posixpath
+from urllib.parse import urlsplit, unquote
+
+def output_url(path, public_dir):
+    # the site-root path an output file is served at; index.html is served for its directory
+    url = '/' + os.path.relpath(path, public_dir).replace(os.sep, '/')
+    if url.endswith('/index.html'):
+        url = url[:-len('index.html')]
+    return url
+
+def is_external(url):
+    parts = urlsplit(url)
+    return parts.scheme != '' or parts.netloc != ''
+
+def resolve_reference(page_url, url):
+    # returns the site-root path a reference on page_url points at, or None for external and in-page references
+    if is_external(url):
+        return None
+    path = unquote(urlsplit(url).path)
+    if path == '':
+        return None
+    if not path.startswith('/'):
+        path = posixpath.join(posixpath.dirname(page_url), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith('/') and resolved != '/':
+        resolved += '/'
+    return resolved
+
+class LinkIndex:
+    # every page's outgoing links and image srcs, resolved against the set of outputs in one lookup each
+    def __init__(self, public_dir):
+        self.public_dir = public_dir
+        self.pages = {}
+        self.outputs = set()
+
+    def add_page(self, source, dest, references):
+        self.pages[dest] = (source, list(references))
+        self.add_output(dest)
+
+    def add_output(self, dest):
+        url = output_url(dest, self.public_dir)
+        self.outputs.add(url)
+        if url.endswith('/') and url != '/':
+            # a directory index is reachable with or without the trailing slash
+            self.outputs.add(url[:-1])
+
+    def resolve(self, dest, url):
+        return resolve_reference(output_url(dest, self.public_dir), url)
+
+    def dangling(self):
+        # yields (source, kind, url) for references that match no page or static file
+        for dest, (source, references) in self.pages.items():
+            for kind, url in references:
+                target = self.resolve(dest, url)
+                if target is not None and target not in self.outputs:
+                    yield source, kind, url
+
+    def reference_count(self):
+        return sum(len(references) for _, references in self.pages.values())
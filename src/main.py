@@ -1,91 +1,510 @@
-import sys, os, shutil
+import sys, os, json, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor
 
 from textnode import TextNode, TextType
-from markdown_blocks import markdown_to_html_node
-from htmlnode import HTMLNode
+from markdown_blocks import collect_references, add_references, first_image, find_title, markdown_to_document, new_metadata, add_block_metadata, markdown_to_blocks, block_to_block_type, render_block, iter_blocks, block_to_html_node, BLOCK_MEMO_SIZE, set_block_memo_size, block_memo_info
+from htmlnode import HTMLNode, ParentNode
+from template import load_template
+from manifest import hash_file, hash_bytes, load_manifest, remove_manifest, MANIFEST_PATH
+from sync import SYNC_MODES, discover_files
+from cache import RenderCache, DEFAULT_MAX_BYTES
+from profiling import BuildProfiler, PROFILE_PATH
+from pipeline import PagePipeline, DEFAULT_CONCURRENCY
+from linkindex import LinkIndex
+from depgraph import DependencyGraph, GRAPH_PATH, RENDER_KINDS
+from assets import AssetMap, site_path
+from siteindex import SiteIndex, ListingError, check_listing_paths, page_record, SITE_INDEX_PATH, POSTS_SECTION, DEFAULT_PAGE_SIZE, SITEMAP_NAME, FEED_NAME
+from images import ImageStage, parse_widths
+from compress import Compressor
+from outputs import copy_static, copy_site_static, finish_build, finish_compression, prune_output, report_dangling
+from shard import parse_shard, shard_pages, shard_dir, new_shard_manifest, save_shard_manifest
+import buildlog, writer
 
-def main():
-    if sys.argv[0] is not None:
-        basepath = sys.argv[1]
-    else:
-        basepath = '/'
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='main.py')
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rebuild outputs whose inputs changed since the last build')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='render pages across N worker processes (0 uses every core)')
+    parser.add_argument('--stream', action='store_true',
+                        help='read markdown line by line and write blocks out as they are rendered')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help='build only shard I of N (split by path hash) into docs.shard-I-of-N; combine them with "merge"')
+    parser.add_argument('--pipeline', nargs='?', type=int, const=DEFAULT_CONCURRENCY, default=0, metavar='N',
+                        help=f'overlap page reads and writes with rendering, N file operations at a time (default {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--sync-mode', choices=SYNC_MODES, default='mtime',
+                        help='how static files are compared with their copies in the output dir')
+    parser.add_argument('--link', action='store_true',
+                        help='hard-link static files into the output dir when it is on the same filesystem')
+    parser.add_argument('--cache', action='store_true',
+                        help='reuse rendered page bodies from .build/cache when the markdown is unchanged')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help='evict least recently used cache entries above this size')
+    parser.add_argument('--block-memo', type=int, default=BLOCK_MEMO_SIZE, metavar='N',
+                        help='remember the rendering of up to N distinct blocks per process (0 disables)')
+    parser.add_argument('--memo-stats', action='store_true',
+                        help='print block memo hit and miss counts after the build')
+    parser.add_argument('--profile', nargs='?', const=PROFILE_PATH, metavar='JSON',
+                        help=f'full serial build timing every stage per page; writes a JSON report (default {PROFILE_PATH})')
+    parser.add_argument('--profile-top', type=int, default=10, metavar='N',
+                        help='number of slowest pages listed after a profiled build')
+    parser.add_argument('--links', choices=('warn', 'error', 'off'), default='warn',
+                        help='report links and images that point at no generated page or static file (error also fails the build)')
+    parser.add_argument('--fingerprint', action='store_true',
+                        help='give static assets content-hashed names and point pages and the template at them')
+    parser.add_argument('--site-url', metavar='URL',
+                        help=f'absolute URL the site is served from; also writes {SITEMAP_NAME}, an Atom feed ({FEED_NAME}) and paginated post listings')
+    parser.add_argument('--posts', default=POSTS_SECTION, metavar='SECTION',
+                        help=f'content directory whose pages are listed and fed as posts (default {POSTS_SECTION})')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, metavar='N',
+                        help=f'posts per listing page (default {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--images', action='store_true',
+                        help='give img tags of static images width and height attributes, read from the image headers')
+    parser.add_argument('--image-widths', type=parse_widths, metavar='W,W',
+                        help='also write PNG images downscaled to these widths and offer them in srcset (implies --images)')
+    parser.add_argument('--gzip', action='store_true',
+                        help='write a .gz next to every changed HTML, CSS, JS, SVG and XML output, for servers that send pre-compressed files')
+    parser.add_argument('--fsync', action='store_true', help='fsync every changed output file once the build is done')
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', '-q', action='store_true', help='print nothing unless something fails')
+    verbosity.add_argument('--verbose', '-v', action='store_true', help='print every page and static file')
+    parser.add_argument('--log-events', metavar='JSONL',
+                        help='write one JSON line per page, static file and removal to this file')
+    args = parser.parse_args(argv)
+    if args.pipeline != 0 and (args.stream or args.jobs != 1):
+        parser.error('--pipeline renders in one process from whole files, so it cannot be combined with --stream or --jobs')
+    if args.shard is not None and (args.incremental or args.profile is not None):
+        parser.error('--shard always builds its whole shard and cannot be combined with --incremental or --profile')
+    if args.shard is not None and args.gzip:
+        parser.error('shards are compressed when they are merged; pass --gzip to "merge" instead')
+    if args.profile is not None and (args.incremental or args.jobs != 1 or args.stream or args.cache or args.pipeline != 0
+                                     or args.fingerprint or args.site_url is not None or args.gzip or args.images
+                                     or args.image_widths is not None):
+        parser.error('--profile times a plain serial build and cannot be combined with --incremental, --jobs, --stream, --cache, '
+                     '--pipeline, --fingerprint, --site-url, --gzip or --images')
+    if args.page_size < 1:
+        parser.error('--page-size must be at least 1')
+    return args
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 0 and argv[0] == 'serve':
+        from serve import serve_main
+        serve_main(argv[1:])
+        return
+    if len(argv) != 0 and argv[0] == 'merge':
+        from shard import merge_main
+        merge_main(argv[1:])
+        return
+    args = parse_args(argv)
+    basepath = args.basepath
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
 
     public_dir = 'docs'
     static_dir = 'static'
     content_dir = 'content'
 
-    clear_public(public_dir)
-    copy_files(static_dir, public_dir)
+    level = buildlog.QUIET if args.quiet else buildlog.VERBOSE if args.verbose else buildlog.SUMMARY
+    log = buildlog.configure(level, args.log_events)
+    output = writer.configure(args.fsync, Compressor() if args.gzip else None)
+    set_block_memo_size(args.block_memo)
+    cache = None
+    if args.cache:
+        cache = RenderCache(max_bytes=args.cache_size * 1024 * 1024)
+        cache.remove_old_versions()
 
-    generate_pages_recursive(content_dir, 'template.html', public_dir, basepath)
+    if args.profile is not None:
+        profiler = BuildProfiler()
+        build_profiled(content_dir, static_dir, 'template.html', public_dir, basepath, profiler, args.sync_mode, args.link)
+        profiler.write_json(args.profile)
+        print(profiler.format_table(args.profile_top))
+        print(f'Profile written to {args.profile}')
+        log.close()
+        return
 
+    # a shard only sees part of the site, so links are checked when the shards are merged
+    links = None if args.links == 'off' or args.shard is not None else LinkIndex(public_dir)
+    assets = None
+    if args.fingerprint:
+        assets = AssetMap(static_dir)
+        assets.build()
+    images = None
+    if args.images or args.image_widths is not None:
+        images = ImageStage(static_dir, args.image_widths or ())
+        images.build(args.fingerprint)
+        log.detail(f'Images: {len(images.attributes)} sized, {images.processed} processed, {len(images.variants)} variants')
+    try:
+        build_site(args, content_dir, static_dir, public_dir, basepath, jobs, cache, assets, images, links)
+    except ListingError as e:
+        log.close()
+        sys.exit(f'build failed: {e}')
+    finish_compression()
+    if output.compressor is not None:
+        output.compressor.close()
+    if args.fsync:
+        log.detail(f'Synced {output.sync()} output files')
 
-def clear_public(dir):
-    
-    if os.path.exists(dir):
-        shutil.rmtree(dir)
-    os.mkdir(dir)
+    if cache is not None:
+        evicted = cache.evict()
+        log.detail(f'Render cache: {cache.hits} hits, {cache.misses} misses, {evicted} evicted')
+    if args.memo_stats:
+        info = block_memo_info()
+        hits = info.hits + worker_memo_stats['hits']
+        misses = info.misses + worker_memo_stats['misses']
+        log.info(f'Block memo: {hits} hits, {misses} misses, {info.currsize}/{info.maxsize} entries in the main process')
+    dangling = 0 if links is None else report_dangling(links)
+    log.summary()
+    log.close()
+    if dangling != 0 and args.links == 'error':
+        sys.exit(1)
+
+def build_site(args, content_dir, static_dir, public_dir, basepath, jobs, cache, assets=None, images=None, links=None):
+    if args.shard is not None:
+        build_shard(content_dir, 'template.html', public_dir, basepath, *args.shard, jobs, args.stream, cache, args.pipeline, assets,
+                    images)
+        return
+    if args.incremental:
+        build_incremental(content_dir, static_dir, 'template.html', public_dir, basepath, MANIFEST_PATH, jobs=jobs, stream=args.stream,
+                          sync_mode=args.sync_mode, link=args.link, cache=cache, pipeline=args.pipeline, assets=assets,
+                          site_url=args.site_url, section=args.posts, page_size=args.page_size, images=images, links=links)
+        return
+
+    # a full rebuild does not record what it wrote, so drop any stale manifest
+    remove_manifest(MANIFEST_PATH)
+    pages = discover_pages(content_dir, public_dir)
+    if args.site_url is not None:
+        check_listing_paths([dest for _, dest in pages], public_dir, args.posts)
+    # outputs are overwritten in place rather than cleared first, so identical files keep their mtimes
+    files, variants, _ = copy_site_static(static_dir, public_dir, args.sync_mode, args.link, assets, images)
+    names = None if assets is None else assets.names
+    attributes = None if images is None else images.attributes
+    results = generate_pages(pages, 'template.html', basepath, jobs, args.stream, cache, args.pipeline, names, attributes, links)
+    # saved even though the manifest is not, so watch builds start out knowing every page's dependencies
+    graph = DependencyGraph(public_dir)
+    index = SiteIndex(public_dir, SiteIndex.load(SITE_INDEX_PATH, public_dir).pages)
+    for (source, dest), (references, metadata) in zip(pages, results):
+        graph.add_page(dest, source, 'template.html', references)
+        index.add_page(source, dest, metadata)
+    finish_build(static_dir, 'template.html', basepath, files, variants, graph, index, links=links, site_url=args.site_url,
+                 section=args.posts, page_size=args.page_size, assets=names, images=attributes)
 
-def copy_files(dir, target):
-    dir_content = os.listdir(dir)
-    for item in dir_content:
-        item_path = os.path.join(dir, item)
-        target_path = os.path.join(target, item)
-        if os.path.isdir(item_path):
-            print(f'DIR {item_path}')
-            os.mkdir(target_path)
-            copy_files(item_path, target_path)
-        else:
-            print(f'FILE {item_path}')
-            shutil.copy(item_path, target_path)
-    
 def extract_title(markdown):
-    split_md = markdown.split('\n')
-    for line in split_md:
-        if line.startswith('# '):
-            return line[2:]
-    raise Exception('No title found')
-
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f'Generating page from {from_path} to {dest_path} using {template_path}')
-    
-    with open(from_path) as file:
-        markdown = file.read()
-        file.close()
-    with open(template_path) as file:
-        template = file.read()
-        file.close
-    
-    title = extract_title(markdown)
-    html_nodes = markdown_to_html_node(markdown)
-    html = html_nodes.to_html()
-
-    template = template.replace('{{ Title }}', title)
-    template = template.replace('{{ Content }}', html)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
-
-    path = os.path.dirname(dest_path)
-    if os.path.exists(path) != True:
-        os.makedirs(path)
-
-    with open(dest_path, 'w') as file:
-        file.write(template)
-        file.close
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    path_contents = os.listdir(dir_path_content)
-    for path in path_contents:
-        full_content_path = os.path.join(dir_path_content, path)
-        full_target_path = os.path.join(dest_dir_path, path)
-        if os.path.isfile(full_content_path):
-            if full_content_path.endswith('.md'):
-               full_target_path = full_target_path[:-3] + '.html'
-               generate_page(full_content_path, template_path, full_target_path, basepath)
+    title = find_title(markdown)
+    if title is None:
+        raise Exception('No title found')
+    return title
+
+def parse_document(markdown):
+    # returns (title, html_nodes, metadata); the title comes out of the block pass rather than a scan of its own
+    html_nodes, metadata = markdown_to_document(markdown)
+    if metadata['title'] is None:
+        raise Exception('No title found')
+    return metadata['title'], html_nodes, metadata
+
+def parse_page_stream(lines):
+    # the title is written before the content, so hold blocks back until it is found;
+    # the rest of the metadata fills in as the blocks are written
+    blocks = iter_blocks(lines)
+    pending = []
+    title = None
+    for block in blocks:
+        pending.append(block)
+        title = find_title(block)
+        if title is not None:
+            break
+    if title is None:
+        raise Exception('No title found')
+    metadata = new_metadata()
+    def html_nodes_with_metadata():
+        for block in itertools.chain(pending, blocks):
+            add_block_metadata(metadata, block)
+            with collect_references() as references:
+                node = block_to_html_node(block)
+            add_references(references, references.words)
+            metadata['words'] += references.words
+            if metadata['image'] is None:
+                metadata['image'] = first_image(references)
+            yield node
+    return title, ParentNode('div', html_nodes_with_metadata()), metadata
+
+def parse_page_cached(markdown, cache):
+    # cache entries hold the body before the basepath rewrite, so they survive template and basepath changes
+    key = cache.key(markdown)
+    entry = cache.get(key)
+    if entry is None:
+        with collect_references() as references:
+            title, html_nodes, metadata = parse_document(markdown)
+            html = html_nodes.to_html()
+        entry = {'title': title, 'html': html, 'references': references, 'metadata': metadata}
+        cache.put(key, entry)
+    add_references(tuple(reference) for reference in entry['references'])
+    metadata = entry['metadata']
+    metadata['outline'] = [tuple(heading) for heading in metadata['outline']]
+    return entry['title'], entry['html'], metadata
+
+def render_document(markdown, template, cache=None):
+    # returns the page html and its metadata
+    if cache is not None:
+        title, content, metadata = parse_page_cached(markdown, cache)
+    else:
+        title, content, metadata = parse_document(markdown)
+    return template.render(Title=title, Content=content), metadata
+
+def write_page(dest_path, template, title, content):
+    # the page is streamed into a temp file, never held whole as a string, and compared there before it replaces dest_path
+    return writer.output.write_stream(dest_path, lambda file: template.write(file, Title=title, Content=content))
+
+def build_page(from_path, dest_path, template, stream=False, cache=None):
+    # returns (size, changed, references, metadata); streamed pages are never held in memory whole, so they bypass the cache
+    with collect_references() as references:
+        with open(from_path) as file:
+            if stream:
+                # the blocks are only tokenized while they are written
+                title, content, metadata = parse_page_stream(file)
+                size, changed = write_page(dest_path, template, title, content)
+                return size, changed, references, metadata
+            markdown = file.read()
+        if cache is not None:
+            title, content, metadata = parse_page_cached(markdown, cache)
         else:
-            if os.path.exists(full_target_path) != True:
-                os.makedirs(full_target_path)
-            generate_pages_recursive(full_content_path, template_path, full_target_path, basepath)
+            title, content, metadata = parse_document(markdown)
+        return *write_page(dest_path, template, title, content), references, metadata
+
+def render_page_collecting(markdown, template, cache=None):
+    with collect_references() as references:
+        html, metadata = render_document(markdown, template, cache)
+    return html.encode(), (references, metadata)
+
+def log_page(from_path, dest_path, template_path, size, changed, references, links=None):
+    buildlog.log.event('page' if changed else 'identical', f'Generating page from {from_path} to {dest_path} using {template_path}',
+                       source=from_path, dest=dest_path, bytes=size if changed else 0)
+    if links is not None:
+        links.add_page(from_path, dest_path, references)
+
+def generate_page(from_path, template_path, dest_path, basepath, template=None, stream=False, cache=None, links=None):
+    # returns (references, metadata)
+    if template is None:
+        template = load_template(template_path, basepath)
+    size, changed, references, metadata = build_page(from_path, dest_path, template, stream, cache)
+    log_page(from_path, dest_path, template_path, size, changed, references, links)
+    return references, metadata
+
+# block memo counts reported back by parallel workers
+worker_memo_stats = {'hits': 0, 'misses': 0}
+
+# per-process state for parallel builds, set once by the pool initializer
+_worker_template = None
+_worker_stream = False
+_worker_cache = None
+
+def _init_worker(template, stream, cache, memo_size):
+    global _worker_template, _worker_stream, _worker_cache
+    # workers only write; the parent records, syncs and compresses what they wrote
+    writer.configure()
+    _worker_template = template
+    _worker_stream = stream
+    _worker_cache = cache
+    set_block_memo_size(memo_size)
+
+def _generate_page_job(page):
+    from_path, dest_path = page
+    hits = 0 if _worker_cache is None else _worker_cache.hits
+    memo_before = block_memo_info()
+    size, changed, references, metadata = build_page(from_path, dest_path, _worker_template, _worker_stream, _worker_cache)
+    memo_after = block_memo_info()
+    cache_hit = _worker_cache is not None and _worker_cache.hits != hits
+    return size, changed, references, metadata, cache_hit, memo_after.hits - memo_before.hits, memo_after.misses - memo_before.misses
+
+def generate_pages(pages, template_path, basepath, jobs=1, stream=False, cache=None, pipeline=0, assets=None, images=None, links=None):
+    # returns each page's (kind, url) references and metadata, in the order of pages
+    template = load_template(template_path, basepath, assets, images)
+    if pipeline > 0:
+        return generate_pages_pipelined(pages, template_path, template, cache, pipeline, links)
+    results = []
+    if jobs <= 1 or len(pages) <= 1:
+        for i, (from_path, dest_path) in enumerate(pages):
+            results.append(generate_page(from_path, template_path, dest_path, basepath, template, stream, cache, links))
+            buildlog.log.progress('Generating pages', i + 1, len(pages))
+        return results
+
+    chunksize = max(1, len(pages) // (jobs * 4))
+    memo_size = block_memo_info().maxsize
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(template, stream, cache, memo_size)) as executor:
+        # map() yields in submission order, so the log matches a serial build
+        jobs_done = executor.map(_generate_page_job, pages, chunksize=chunksize)
+        for i, ((from_path, dest_path), (size, changed, references, metadata, hit, memo_hits, memo_misses)) in enumerate(zip(pages, jobs_done)):
+            log_page(from_path, dest_path, template_path, size, changed, references, links)
+            results.append((references, metadata))
+            if changed:
+                writer.output.record(dest_path)
+            writer.output.compress(dest_path, None, changed)
+            buildlog.log.progress('Generating pages', i + 1, len(pages))
+            worker_memo_stats['hits'] += memo_hits
+            worker_memo_stats['misses'] += memo_misses
+            if cache is not None and not stream:
+                # workers count into their own copy of the cache
+                if hit:
+                    cache.hits += 1
+                else:
+                    cache.misses += 1
+    return results
+
+def generate_pages_pipelined(pages, template_path, template, cache=None, concurrency=DEFAULT_CONCURRENCY, links=None):
+    results = []
+    def on_page(from_path, dest_path, size, changed, result):
+        log_page(from_path, dest_path, template_path, size, changed, result[0], links)
+        results.append(result)
+        buildlog.log.progress('Generating pages', len(results), len(pages))
+    pipeline = PagePipeline(lambda markdown: render_page_collecting(markdown, template, cache), concurrency, on_page)
+    pipeline.run(pages)
+    return results
+
+def profile_page(from_path, dest_path, template, profiler):
+    # mirrors build_page, but runs each stage separately (and without the block memo) so it can be timed
+    profiler.start_page(from_path, dest_path)
+    with profiler.stage('read'):
+        with open(from_path) as file:
+            markdown = file.read()
+    with profiler.stage('block_split'):
+        blocks = markdown_to_blocks(markdown)
+    with profiler.stage('metadata'):
+        metadata = new_metadata()
+        for block in blocks:
+            add_block_metadata(metadata, block)
+        if metadata['title'] is None:
+            raise Exception('No title found')
+        title = metadata['title']
+    with profiler.stage('classification'):
+        block_types = [block_to_block_type(block) for block in blocks]
+    with profiler.stage('inline_tokenization'):
+        html_nodes = ParentNode('div', [render_block(block, block_type) for block, block_type in zip(blocks, block_types)])
+    with profiler.stage('to_html'):
+        html = html_nodes.to_html()
+    with profiler.stage('template_fill'):
+        page = template.render(Title=title, Content=html)
+    with profiler.stage('write'):
+        writer.output.write(dest_path, page.encode())
+
+def build_profiled(content_dir, static_dir, template_path, public_dir, basepath, profiler, sync_mode='mtime', link=False,
+                   manifest_path=MANIFEST_PATH):
+    # like a full build, outputs are overwritten in place and whatever the build did not write is pruned
+    remove_manifest(manifest_path)
+    with profiler.stage('static_sync'):
+        files, _ = copy_static(static_dir, public_dir, sync_mode, link)
+    with profiler.stage('discovery'):
+        pages = discover_pages(content_dir, public_dir)
+    template = load_template(template_path, basepath)
+    for from_path, dest_path in pages:
+        profile_page(from_path, dest_path, template, profiler)
+    prune_output(public_dir, [dest for _, dest in files + pages])
+
+def discover_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for source, dest in discover_files(dir_path_content, dest_dir_path, '.md'):
+        pages.append((source, dest[:-3] + '.html'))
+    return pages
+
+
+def template_key(template_path, basepath, assets=None, images=None):
+    template_hash = hash_file(template_path)
+    if assets is None and images is None:
+        return template_hash
+    # the template's output also changes when an asset it refers to gets a new name, or an image it shows new attributes
+    template = load_template(template_path, basepath, assets, images)
+    return hash_bytes(json.dumps([template_hash, template.assets_used, template.images_used]).encode())
+
+def build_shard(content_dir, template_path, public_dir, basepath, index, count, jobs=1, stream=False, cache=None, pipeline=0, assets=None,
+                images=None):
+    # static files, image variants and the link check are left to merge, which sees every shard
+    dir = shard_dir(public_dir, index, count)
+    names = None if assets is None else assets.names
+    attributes = None if images is None else images.attributes
+    pages = shard_pages(discover_pages(content_dir, dir), content_dir, index, count)
+    results = generate_pages(pages, template_path, basepath, jobs, stream, cache, pipeline, names, attributes)
+    manifest = new_shard_manifest(index, count, basepath, template_key(template_path, basepath, names, attributes), names is not None,
+                                  None if images is None else list(images.widths))
+    for (source, dest), (references, metadata) in zip(pages, results):
+        manifest['pages'][site_path(dest, dir)] = {'source': source, 'hash': hash_file(source), 'output': hash_file(dest),
+                                                   'references': references, 'record': page_record(source, dest, dir, metadata)}
+    prune_output(dir, [dest for _, dest in pages])
+    save_shard_manifest(dir, manifest)
+    buildlog.log.detail(f'Shard {index}/{count}: {len(pages)} pages in {dir}')
+    return manifest
+
+def build_incremental(content_dir, static_dir, template_path, public_dir, basepath, manifest_path, *, jobs=1, stream=False,
+                      sync_mode='mtime', link=False, cache=None, pipeline=0, graph_path=GRAPH_PATH, assets=None,
+                      index_path=SITE_INDEX_PATH, site_url=None, section=POSTS_SECTION, page_size=DEFAULT_PAGE_SIZE, images=None,
+                      links=None):
+    pages = discover_pages(content_dir, public_dir)
+    if site_url is not None:
+        check_listing_paths([dest for _, dest in pages], public_dir, section)
+    old_manifest = load_manifest(manifest_path)
+    old_graph = DependencyGraph.load(graph_path, public_dir)
+    old_index = SiteIndex.load(index_path, public_dir)
+    manifest = {'version': old_manifest['version'], 'pages': {}, 'static': {}, 'templates': {}, 'generated': {}, 'images': {}}
+    graph = DependencyGraph(public_dir)
+    index = SiteIndex(public_dir, old_index.pages)
+    stats = {'rendered': 0, 'copied': 0, 'removed': 0, 'unchanged': 0}
+
+    changed = []
+    names = None if assets is None else assets.names
+    attributes = None if images is None else images.attributes
+    template_hash = template_key(template_path, basepath, names, attributes)
+    manifest['templates'][template_path] = template_hash
+    if old_manifest['templates'].get(template_path) != template_hash:
+        changed.append(template_path)
+    # pages showing an image whose attributes changed, appeared or went away are rendered again
+    if attributes is not None:
+        manifest['images'] = attributes
+    for path in old_manifest['images'].keys() | manifest['images'].keys():
+        if old_manifest['images'].get(path) != manifest['images'].get(path):
+            changed.append('/' + path)
+
+    # static files go first, since the pages showing a changed image have to be rendered again
+    # static copies are compared against the output dir itself, so the manifest only tracks ownership
+    changed_static = []
+    files, variants, sync_stats = copy_site_static(static_dir, public_dir, sync_mode, link, assets, images, changed_static)
+    stats['copied'] = sync_stats['copied'] + sync_stats['linked']
+    stats['unchanged'] += sync_stats['unchanged']
+    changed.extend('/' + site_path(source, static_dir) for source in changed_static)
+
+    stale = old_graph.stale(changed)
+    if assets is not None:
+        # links to a fingerprinted file carry its hash too, so pages merely linking to a changed,
+        # added or removed static file are rendered again as well
+        copied = {source for source, _ in files}
+        removed_static = [entry['source'] for entry in old_manifest['static'].values()
+                          if entry['source'] not in copied and not os.path.relpath(entry['source'], static_dir).startswith(os.pardir)]
+        linked = ['/' + site_path(source, static_dir) for source in changed_static + removed_static]
+        stale |= old_graph.stale(linked, RENDER_KINDS + ('link',))
+    changed_pages = []
+    for source, dest in pages:
+        entry = {'source': source, 'hash': hash_file(source), 'basepath': basepath, 'fingerprint': names is not None}
+        manifest['pages'][dest] = entry
+        if (old_manifest['pages'].get(dest) == entry and dest in old_graph.pages and dest in old_index.pages
+                and dest not in stale and os.path.exists(dest)):
+            stats['unchanged'] += 1
+            buildlog.log.event('unchanged', None, path=dest)
+            # unchanged pages are not tokenized again, so their dependencies and metadata come from the last build
+            graph.pages[dest] = old_graph.pages[dest]
+            index.pages[dest] = old_index.pages[dest]
+            writer.output.compress(dest, None, False)
+            if links is not None:
+                links.add_page(source, dest, old_graph.references(dest))
+            continue
+        changed_pages.append((source, dest))
+    results = generate_pages(changed_pages, template_path, basepath, jobs, stream, cache, pipeline, names, attributes, links)
+    for (source, dest), (references, metadata) in zip(changed_pages, results):
+        graph.add_page(dest, source, template_path, references)
+        index.add_page(source, dest, metadata)
+    stats['rendered'] = len(changed_pages)
+
+    stats['removed'] = finish_build(static_dir, template_path, basepath, files, variants, graph, index, links=links, site_url=site_url,
+                                    section=section, page_size=page_size, assets=names, images=attributes, manifest=manifest,
+                                    old_manifest=old_manifest, manifest_path=manifest_path, graph_path=graph_path, index_path=index_path)
+    buildlog.log.detail(f"Incremental build: {stats['rendered']} rendered, {stats['copied']} copied, {stats['removed']} removed, {stats['unchanged']} unchanged")
+    return stats
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
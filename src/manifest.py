@@ -0,0 +1,40 @@
+import os, json, hashlib
+
+from files import save_json
+
+MANIFEST_PATH = os.path.join('.build', 'manifest.json')
+MANIFEST_VERSION = 6
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def new_manifest():
+    # generated holds the sitemap, feed and listing pages, which come from no single source file;
+    # images holds the image attributes the pages were rendered with
+    return {'version': MANIFEST_VERSION, 'pages': {}, 'static': {}, 'templates': {}, 'generated': {}, 'images': {}}
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return new_manifest()
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return new_manifest()
+    if manifest.get('version') != MANIFEST_VERSION:
+        return new_manifest()
+    return manifest
+
+def save_manifest(path, manifest):
+    save_json(path, manifest, indent=1, sort_keys=True)
+
+def remove_manifest(path):
+    if os.path.exists(path):
+        os.remove(path)
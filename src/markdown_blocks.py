@@ -1,8 +1,9 @@
-import re
+import re, functools
 from enum import Enum
+from contextlib import contextmanager
 
 from textnode import TextNode, TextType, text_to_textnodes, text_node_to_html_node
-from htmlnode import HTMLNode, ParentNode, LeafNode
+from htmlnode import HTMLNode, ParentNode, LeafNode, FragmentNode
 
 class BlockType(Enum):
     PARAGRAPH = 'paragraph'
@@ -13,35 +14,51 @@ class BlockType(Enum):
     ORDERED_LIST = 'ordered_list'
 
 def markdown_to_blocks(markdown):
-    blocks = markdown.split('\n\n')
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
+    return list(iter_blocks(markdown.split('\n')))
+
+def iter_blocks(lines):
+    # lines may be a file object; blank lines inside a code fence stay in the block
+    block = []
+    in_code = False
+    for line in lines:
+        line = line.rstrip('\n')
+        if in_code:
+            if line.rstrip().endswith('```'):
+                in_code = False
+        elif line.startswith('```'):
+            fence = line.rstrip()
+            in_code = len(fence) < 6 or not fence.endswith('```')
+        elif line.strip() == '':
+            if len(block) != 0:
+                yield '\n'.join(block).strip()
+                block = []
             continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
+        block.append(line)
+    if len(block) != 0:
+        yield '\n'.join(block).strip()
 
-def block_to_block_type(markdown):
-    lines = markdown.split('\n')
+HEADING_PATTERN = re.compile(r'(#{1,6}) ')
+CODE_PATTERN = re.compile(r'```\n*([\S\s]*)```')
+QUOTE_LINE_PATTERN = re.compile(r'>(.*)')
+ORDERED_ITEM_PATTERN = re.compile(r'\d+\. (.*)')
 
-    if len(re.findall(r'#{1,6} .*', markdown)) != 0:
+def block_to_block_type(markdown):
+    # classify on the block prefix; every line is only visited for multi-line kinds
+    if HEADING_PATTERN.match(markdown):
         return BlockType.HEADING
-    elif len(re.findall(r'```[\S\s]*```', markdown)) != 0:
+    elif len(markdown) >= 6 and markdown.startswith('```') and markdown.endswith('```'):
         return BlockType.CODE
-    elif len(re.findall(r'>.*', markdown)) != 0:
-        for line in lines:
-            if not line.startswith('>'):
-                return BlockType.PARAGRAPH
+    elif markdown.startswith('>'):
+        if markdown.count('\n') != markdown.count('\n>'):
+            return BlockType.PARAGRAPH
         return BlockType.QUOTE
-    elif len(re.findall(r'- .*', markdown)) != 0:
-        for line in lines:
-            if not line.startswith('-'):
-                return BlockType.PARAGRAPH
+    elif markdown.startswith('- '):
+        if markdown.count('\n') != markdown.count('\n- '):
+            return BlockType.PARAGRAPH
         return BlockType.UNORDERED_LIST
-    elif len(re.findall(r'1\. .*', markdown)) != 0:
+    elif markdown.startswith('1. '):
         i = 1
-        for line in lines:
+        for line in markdown.split('\n'):
             if not line.startswith(f'{i}. '):
                 return BlockType.PARAGRAPH
             i += 1
@@ -57,8 +74,122 @@ def markdown_to_html_node(markdown):
         html_nodes.append(new_html_node)
     return ParentNode('div', html_nodes)
 
+def find_title(markdown):
+    split_md = markdown.split('\n')
+    for line in split_md:
+        if line.startswith('# '):
+            return line[2:]
+    return None
+
+def new_metadata():
+    return {'title': None, 'outline': [], 'words': 0, 'image': None}
+
+def add_block_metadata(metadata, block):
+    # works from the block text alone, so memo hits contribute the same as freshly rendered blocks;
+    # words are counted by the renderer, from the text nodes it tokenizes the block into
+    if metadata['title'] is None:
+        metadata['title'] = find_title(block)
+    heading = HEADING_PATTERN.match(block)
+    if heading is not None:
+        level = len(heading.group(1))
+        metadata['outline'].append((level, block[level + 1:].split('\n', 1)[0]))
+
+def markdown_to_document(markdown):
+    # returns the page tree and its metadata: the first "# " title, the (level, text) heading outline,
+    # the word count and the first image src, all gathered in the one pass over the blocks
+    metadata = new_metadata()
+    html_nodes = []
+    with collect_references() as references:
+        for block in iter_blocks(markdown.split('\n')):
+            html_nodes.append(block_to_html_node(block))
+            add_block_metadata(metadata, block)
+    add_references(references, references.words)
+    metadata['words'] = references.words
+    metadata['image'] = first_image(references)
+    return ParentNode('div', html_nodes), metadata
+
+def first_image(references):
+    return next((url for kind, url in references if kind == 'image'), None)
+
+def outline_to_html_node(outline):
+    # nested <ul> lists for a table of contents; a deeper heading opens a list inside the item before it
+    root = ParentNode('ul', [])
+    stack = [(None, root)]  # (heading level of the list's items, list)
+    for level, text in outline:
+        while len(stack) > 1 and stack[-1][0] > level:
+            if stack[-2][0] < level:
+                # an h3 list followed by an h2 under the same h1: the h2 joins that list
+                stack[-1] = (level, stack[-1][1])
+                break
+            stack.pop()
+        list_level, node = stack[-1]
+        if list_level is None:
+            stack[-1] = (level, node)
+        elif level > list_level:
+            node = ParentNode('ul', [])
+            stack[-1][1].children[-1].children.append(node)
+            stack.append((level, node))
+        node.children.append(ParentNode('li', text_to_html_nodes(text)))
+    return root
+
+class References(list):
+    # (kind, url) pairs for links and images, plus the number of words in the text they were tokenized from
+    def __init__(self):
+        super().__init__()
+        self.words = 0
+
+# the References being gathered while inline text is tokenized; None when nobody is collecting
+_references = None
+REFERENCE_KINDS = {TextType.TEXT_LINK: 'link', TextType.TEXT_IMAGE: 'image'}
+
+@contextmanager
+def collect_references():
+    global _references
+    outer = _references
+    _references = references = References()
+    try:
+        yield references
+    finally:
+        _references = outer
+
+def add_references(references, words=0):
+    # for callers that skip tokenizing (memo and cache hits) but still know what a block or page refers to
+    if _references is not None:
+        _references.extend(references)
+        _references.words += words
+
+BLOCK_MEMO_SIZE = 4096
+# longer blocks are rarely repeated and would pin large strings in the memo
+BLOCK_MEMO_MAX_CHARS = 4096
+
+def _render_block_fragment(block):
+    # the block's references are memoized with it, so a hit reports them without tokenizing again
+    with collect_references() as references:
+        node = render_block(block)
+    return FragmentNode(node), tuple(references), references.words
+
+_block_memo = functools.lru_cache(maxsize=BLOCK_MEMO_SIZE)(_render_block_fragment)
+_block_memo_enabled = True
+
+def set_block_memo_size(maxsize):
+    global _block_memo, _block_memo_enabled
+    _block_memo = functools.lru_cache(maxsize=maxsize)(_render_block_fragment)
+    _block_memo_enabled = maxsize != 0
+
+def block_memo_info():
+    return _block_memo.cache_info()
+
 def block_to_html_node(block):
-    match block_to_block_type(block):
+    if not _block_memo_enabled or len(block) > BLOCK_MEMO_MAX_CHARS:
+        return render_block(block)
+    fragment, references, words = _block_memo(block)
+    add_references(references, words)
+    return fragment
+
+def render_block(block, block_type=None):
+    if block_type is None:
+        block_type = block_to_block_type(block)
+    match block_type:
         case BlockType.PARAGRAPH:
             return paragraph_to_html_node(block)
         case BlockType.HEADING:
@@ -76,10 +207,16 @@ def block_to_html_node(block):
 
 def text_to_html_nodes(text):
     text_nodes = text_to_textnodes(text)
+    if _references is not None:
+        # the visible text only: markers are gone from the nodes, and an image's alt text is not read as words;
+        # the nodes are joined first so a word with markup inside it counts once
+        _references.words += len(''.join(node.text for node in text_nodes if node.text_type != TextType.TEXT_IMAGE).split())
     html_nodes = []
     for text_node in text_nodes:
         new_html_node = text_node_to_html_node(text_node)
         html_nodes.append(new_html_node)
+        if _references is not None and text_node.text_type in REFERENCE_KINDS:
+            _references.append((REFERENCE_KINDS[text_node.text_type], text_node.url))
     return html_nodes
 
 def paragraph_to_html_node(block):
@@ -89,13 +226,15 @@ def paragraph_to_html_node(block):
     return ParentNode('p', html_nodes)
 
 def heading_to_html_node(block):
-    h_count = len(re.findall(r'(#{1,6}) .*', block)[0])
+    h_count = len(HEADING_PATTERN.match(block).group(1))
     text = block[h_count + 1:]
     html_nodes = text_to_html_nodes(text)
     return ParentNode(f'h{h_count}', html_nodes)
 
 def code_to_html_node(block):
-    code = re.findall(r'```\n*([\S\s]*)```', block)[0]
+    code = CODE_PATTERN.match(block).group(1)
+    if _references is not None:
+        _references.words += len(code.split())
     text_node = TextNode(code, TextType.TEXT_CODE)
     html_nodes = text_node_to_html_node(text_node)
     return ParentNode('pre', [html_nodes])
@@ -104,7 +243,7 @@ def quote_to_html_node(block):
     lines = block.split('\n')
     all_lines = []
     for line in lines:
-        text = re.findall(r'>(.*)', line)[0].strip()
+        text = QUOTE_LINE_PATTERN.match(line).group(1).strip()
         all_lines.append(text)
     joined_lines = " ".join(all_lines)
     html_nodes = text_to_html_nodes(joined_lines)
@@ -114,7 +253,7 @@ def ordered_list_to_html_node(block):
     items = block.split('\n')
     html_nodes = []
     for item in items:
-        text = re.findall(r'\d+\. (.*)', item)[0]
+        text = ORDERED_ITEM_PATTERN.match(item).group(1)
         new_html_node = text_to_html_nodes(text)
         html_nodes.append(ParentNode('li', new_html_node))
     return ParentNode('ol', html_nodes)
@@ -127,59 +266,3 @@ def unordered_list_to_html_node(block):
         new_html_node = text_to_html_nodes(text)
         html_nodes.append(ParentNode('li', new_html_node))
     return ParentNode('ul', html_nodes)
-
-def old_markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    new_html_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        if block_type == BlockType.CODE:
-            code_text = re.findall(r'```\n*([\S\s]*)```', block)[0]
-            code_text_node = TextNode(code_text, TextType.TEXT_CODE)
-            code_html_node = text_node_to_html_node(code_text_node)
-            new_html_nodes.append(ParentNode('pre', [code_html_node]))
-        else:
-            text_nodes = text_to_textnodes(block)
-            html_nodes_to_add = []
-            for text_node in text_nodes:
-                text_node.text = text_node.text.replace('\n', ' ')
-                if block_type == BlockType.HEADING:
-                    text_node.text = re.findall(r'#{1,6} (.*)', text_node.text)[0]
-                    html_nodes_to_add.append(text_node_to_html_node(text_node))
-                elif block_type == BlockType.QUOTE:
-                    text_node.text = re.findall(r'>(.*)', text_node.text)[0]
-                    html_nodes_to_add.append(text_node_to_html_node(text_node))
-                elif block_type == BlockType.UNORDERED_LIST:
-                    split_nodes = split_lists_node(text_node, block_type)
-                    for node in split_nodes:
-                        html_nodes_to_add.append(ParentNode('li', [text_node_to_html_node(node)]))
-                elif block_type == BlockType.ORDERED_LIST:
-                    split_nodes = split_lists_node(block, block_type)
-                    for node in split_nodes:
-                        html_nodes_to_add.append(ParentNode('li', [text_node_to_html_node(node)]))
-                else:
-                    html_nodes_to_add.append(text_node_to_html_node(text_node))
-            if block_type == BlockType.PARAGRAPH:
-                new_html_nodes.append(ParentNode('p', html_nodes_to_add))
-            elif block_type == BlockType.HEADING:
-                h_count = len(re.findall(r'(#{1,6}) .*', block)[0])
-                new_html_nodes.append(ParentNode(f'h{h_count}', html_nodes_to_add))
-            elif block_type == BlockType.QUOTE:
-                new_html_nodes.append(ParentNode('blockquote', html_nodes_to_add))
-            elif block_type == BlockType.UNORDERED_LIST:
-                new_html_nodes.append(ParentNode('ul', html_nodes_to_add))
-            elif block_type ==BlockType.ORDERED_LIST:
-                new_html_nodes.append(ParentNode('ol', html_nodes_to_add))
-    return ParentNode('div', new_html_nodes)
-
-def split_lists_node(original_node, type):
-    new_nodes = []
-    if type == BlockType.UNORDERED_LIST:
-        for item in original_node.text.split('-'):
-            new_nodes.extend(text_to_textnodes(item.strip()))
-    elif type == BlockType.ORDERED_LIST:
-            split_items = original_node.split('\n')
-            for item in split_items:
-                item = re.findall(r'\d+\. (.*)', item)[0]
-                new_nodes.extend(text_to_textnodes(item.strip()))
-    return new_nodes
\ No newline at end of file
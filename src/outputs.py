@@ -0,0 +1,164 @@
+import os
+
+import buildlog, writer
+from sync import sync_tree, sync_file
+from compress import compressible, gzip_path, remove_stale
+from template import load_template
+from manifest import save_manifest, MANIFEST_PATH
+from depgraph import GRAPH_PATH
+from siteindex import ListingError, SITE_INDEX_PATH, POSTS_SECTION, DEFAULT_PAGE_SIZE, SITEMAP_NAME, FEED_NAME
+
+# kinds of manifest entry that own a file in the output dir
+OUTPUT_KINDS = ('pages', 'static', 'generated')
+
+def log_static_result(source, dest, result):
+    if result == 'unchanged':
+        buildlog.log.event('unchanged', None, path=dest)
+        writer.output.compress(dest, None, False)
+    else:
+        buildlog.log.event('static', f'{result.upper()} {source}', source=source, dest=dest, bytes=os.path.getsize(dest))
+        writer.output.record(dest)
+        writer.output.compress(dest)
+
+def copy_variants(images, public_dir, mode='mtime', link=False):
+    # downscaled images are kept in the image cache and synced into the output like static files
+    files = []
+    for source, name in images.variants:
+        dest = os.path.join(public_dir, *name.split('/'))
+        writer.output.makedirs(os.path.dirname(dest))
+        log_static_result(source, dest, sync_file(source, dest, mode, link))
+        files.append((source, dest))
+    return files
+
+def copy_static(dir, target, mode='mtime', link=False, changed=None, assets=None):
+    # changed, when given, collects the sources that were copied or linked
+    def on_result(source, dest, result):
+        log_static_result(source, dest, result)
+        if changed is not None and result != 'unchanged':
+            changed.append(source)
+    files, stats = sync_tree(dir, target, mode, link, on_result=on_result, rename=None if assets is None else assets.rename)
+    buildlog.log.detail(f"Static files from {dir}: {stats['copied']} copied, {stats['linked']} linked, {stats['unchanged']} unchanged")
+    return files, stats
+
+def copy_site_static(static_dir, public_dir, mode='mtime', link=False, assets=None, images=None, changed=None):
+    # returns (static files, image variants, sync stats of the static files), each file a (source, dest) pair
+    files, stats = copy_static(static_dir, public_dir, mode, link, changed, assets)
+    variants = [] if images is None else copy_variants(images, public_dir, mode, link)
+    return files, variants, stats
+
+def index_static(static_dir, public_dir, files, links):
+    # pages refer to static files by their original names, even when the copies are fingerprinted
+    if links is not None:
+        for source, _ in files:
+            links.add_output(os.path.join(public_dir, os.path.relpath(source, static_dir)))
+
+def report_dangling(links):
+    dangling = 0
+    for source, kind, url in links.dangling():
+        dangling += 1
+        buildlog.log.event('dangling', None, source=source, reference=kind, url=url)
+        buildlog.log.info(f'Dangling {kind} in {source}: {url}')
+    buildlog.log.detail(f'Link check: {links.reference_count()} references, {dangling} dangling')
+    return dangling
+
+def generate_aggregates(index, template_path, basepath, site_url, *, section=POSTS_SECTION, page_size=DEFAULT_PAGE_SIZE, assets=None,
+                        images=None, links=None):
+    # the sitemap, feed and listing pages are rebuilt from the site index alone, so no markdown is read;
+    # returns their output paths
+    template = load_template(template_path, basepath, assets, images)
+    listings = list(index.listing_pages(section, page_size))
+    outputs = []
+    for dest, _, title, content, _ in listings:
+        if dest in index.pages:
+            raise ListingError(f'{dest} is both a content page and a listing page')
+        outputs.append((dest, template.render(Title=title, Content=content)))
+    outputs.append((os.path.join(index.public_dir, SITEMAP_NAME), index.sitemap_xml(site_url, basepath, listings)))
+    outputs.append((os.path.join(index.public_dir, FEED_NAME), index.atom_feed(site_url, basepath, section)))
+    for dest, text in outputs:
+        size, changed = writer.output.write(dest, text.encode())
+        if changed:
+            buildlog.log.event('generated', f'Generated {dest}', dest=dest, bytes=size)
+        else:
+            buildlog.log.event('unchanged', None, path=dest)
+        if links is not None:
+            links.add_output(dest)
+    return [dest for dest, _ in outputs]
+
+def finish_compression():
+    # waits for the .gz siblings submitted so far
+    compressor = writer.output.compressor
+    if compressor is None:
+        return
+    for path, size in compressor.wait():
+        buildlog.log.event('compressed', f'Compressed {path}', path=gzip_path(path), bytes=size)
+        writer.output.record(gzip_path(path))
+
+def with_compressed(paths):
+    # output paths plus the .gz siblings they have when compressing
+    if writer.output.compressor is None:
+        return paths
+    return paths + [gzip_path(path) for path in paths if compressible(path)]
+
+def prune_output(dir, keep):
+    keep = set(keep)
+    removed = 0
+    for root, dirs, names in os.walk(dir, topdown=False):
+        for name in names:
+            path = os.path.join(root, name)
+            if path not in keep:
+                os.remove(path)
+                removed += 1
+                buildlog.log.event('removed', f'Removed {path}', path=path)
+        if root != dir and len(os.listdir(root)) == 0:
+            os.rmdir(root)
+    return removed
+
+def remove_output(dest, public_dir):
+    if os.path.exists(dest):
+        os.remove(dest)
+    remove_stale(dest)
+    path = os.path.dirname(dest)
+    while path != public_dir and path.startswith(public_dir) and os.path.isdir(path) and len(os.listdir(path)) == 0:
+        os.rmdir(path)
+        path = os.path.dirname(path)
+
+def remove_unowned(old_manifest, manifest, public_dir):
+    # outputs the last build wrote that this one no longer owns; the rest of the output dir is left alone
+    removed = 0
+    for kind in OUTPUT_KINDS:
+        for dest in old_manifest[kind]:
+            if not any(dest in manifest[other] for other in OUTPUT_KINDS):
+                remove_output(dest, public_dir)
+                removed += 1
+                buildlog.log.event('removed', f'Removed {dest}', path=dest)
+    return removed
+
+def finish_build(static_dir, template_path, basepath, files, variants, graph, index, *, links=None, site_url=None,
+                 section=POSTS_SECTION, page_size=DEFAULT_PAGE_SIZE, assets=None, images=None, manifest=None, old_manifest=None,
+                 manifest_path=MANIFEST_PATH, graph_path=GRAPH_PATH, index_path=SITE_INDEX_PATH):
+    # how every whole-site build ends once its static files are copied and its pages are in graph and index:
+    # the aggregates, compression, removal of stale outputs and the state the next build starts from.
+    # With old_manifest only what it owned is removed; otherwise everything the build did not write is pruned.
+    # Returns the number of outputs removed. The settings are keyword-only, since most of them share a type.
+    public_dir = index.public_dir
+    generated = []
+    if site_url is not None:
+        generated = generate_aggregates(index, template_path, basepath, site_url, section=section, page_size=page_size, assets=assets,
+                                        images=images, links=links)
+    index_static(static_dir, public_dir, files, links)
+    # removing must not race the compressor's temp files, and keeps the siblings it wrote
+    finish_compression()
+    if manifest is not None:
+        for source, dest in files + variants:
+            manifest['static'][dest] = {'source': source}
+        for dest in generated:
+            manifest['generated'][dest] = {}
+    if old_manifest is not None:
+        removed = remove_unowned(old_manifest, manifest, public_dir)
+    else:
+        removed = prune_output(public_dir, with_compressed([dest for _, dest in files + variants] + list(index.pages) + generated))
+    if manifest is not None:
+        save_manifest(manifest_path, manifest)
+    graph.save(graph_path)
+    index.save(index_path)
+    return removed
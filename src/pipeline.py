@@ -0,0 +1,58 @@
+import asyncio
+from collections import deque
+
+import writer
+
+DEFAULT_CONCURRENCY = 8
+
+def read_text(path):
+    with open(path) as file:
+        return file.read()
+
+class PagePipeline:
+    # reads of upcoming pages and writes of finished ones run in threads while the event loop renders;
+    # at most `concurrency` file operations are in flight, and pages are rendered and reported in order.
+    # render(markdown) returns the page bytes and whatever else on_page should be told about it
+    def __init__(self, render, concurrency=DEFAULT_CONCURRENCY, on_page=None):
+        self.render = render
+        self.concurrency = max(1, concurrency)
+        self.on_page = on_page
+
+    def run(self, pages):
+        return asyncio.run(self.run_async(pages))
+
+    async def run_async(self, pages):
+        self.limit = asyncio.Semaphore(self.concurrency)
+        upcoming = iter(pages)
+        reads = deque()
+        writes = deque()
+        results = []
+        for _ in range(self.concurrency):
+            self.schedule_read(upcoming, reads)
+        while len(reads) != 0:
+            (from_path, dest_path), read = reads.popleft()
+            markdown = await read
+            self.schedule_read(upcoming, reads)
+            data, info = self.render(markdown)
+            writes.append((from_path, dest_path, info, asyncio.create_task(self.io(writer.output.write, dest_path, data))))
+            # finished pages wait for their write; don't let them pile up in memory
+            if len(writes) > self.concurrency:
+                results.append(await self.finish(*writes.popleft()))
+        while len(writes) != 0:
+            results.append(await self.finish(*writes.popleft()))
+        return results
+
+    def schedule_read(self, upcoming, reads):
+        page = next(upcoming, None)
+        if page is not None:
+            reads.append((page, asyncio.create_task(self.io(read_text, page[0]))))
+
+    async def io(self, function, *args):
+        async with self.limit:
+            return await asyncio.to_thread(function, *args)
+
+    async def finish(self, from_path, dest_path, info, write):
+        size, changed = await write
+        if self.on_page is not None:
+            self.on_page(from_path, dest_path, size, changed, info)
+        return size, changed
@@ -0,0 +1,78 @@
+import os, sys, time
+from contextlib import contextmanager
+
+from files import save_json
+
+PAGE_STAGES = (
+    'read',
+    'block_split',
+    'metadata',
+    'classification',
+    'inline_tokenization',
+    'to_html',
+    'template_fill',
+    'write',
+)
+BUILD_STAGES = ('discovery', 'static_sync')
+PROFILE_PATH = os.path.join('.build', 'profile.json')
+
+def new_stage_totals(stages):
+    return {stage: {'seconds': 0.0, 'allocated_blocks': 0} for stage in stages}
+
+class BuildProfiler:
+    # allocations are net counts of allocated memory blocks (sys.getallocatedblocks), which is cheap enough per stage
+    def __init__(self):
+        self.build_stages = new_stage_totals(BUILD_STAGES)
+        self.page_stages = new_stage_totals(PAGE_STAGES)
+        self.pages = []
+        self.current = None
+
+    def start_page(self, source, dest):
+        self.current = {'source': source, 'dest': dest, 'seconds': 0.0, 'stages': new_stage_totals(PAGE_STAGES)}
+        self.pages.append(self.current)
+
+    @contextmanager
+    def stage(self, name):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated = sys.getallocatedblocks() - blocks
+            if name in self.build_stages:
+                totals = [self.build_stages[name]]
+            else:
+                self.current['seconds'] += seconds
+                totals = [self.page_stages[name], self.current['stages'][name]]
+            for total in totals:
+                total['seconds'] += seconds
+                total['allocated_blocks'] += allocated
+
+    def report(self):
+        return {
+            'pages_total': len(self.pages),
+            'seconds_total': sum(s['seconds'] for s in self.build_stages.values()) + sum(s['seconds'] for s in self.page_stages.values()),
+            'build_stages': self.build_stages,
+            'page_stages': self.page_stages,
+            'pages': self.pages,
+        }
+
+    def write_json(self, path=PROFILE_PATH):
+        save_json(path, self.report(), indent=1)
+
+    def format_table(self, top=10):
+        report = self.report()
+        total = report['seconds_total'] or 1e-9
+        lines = [f'{"stage":<24} {"ms":>10} {"share":>7} {"alloc blocks":>14}']
+        for stages in (report['build_stages'], report['page_stages']):
+            for name, stage in stages.items():
+                lines.append(f'{name:<24} {stage["seconds"] * 1000:>10.2f} {stage["seconds"] / total:>7.1%} {stage["allocated_blocks"]:>14}')
+        lines.append(f'{"total":<24} {report["seconds_total"] * 1000:>10.2f}')
+        lines.append('')
+        slowest = sorted(self.pages, key=lambda page: page['seconds'], reverse=True)[:top]
+        lines.append(f'{"slowest pages":<48} {"ms":>10} {"slowest stage":>20}')
+        for page in slowest:
+            worst = max(page['stages'], key=lambda name: page['stages'][name]['seconds'])
+            lines.append(f'{page["source"]:<48} {page["seconds"] * 1000:>10.2f} {worst:>20}')
+        return '\n'.join(lines)
@@ -0,0 +1,234 @@
+import os, sys, time, argparse, threading, functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import main as site
+from template import load_template
+from watch import create_watcher
+from sync import sync_file
+from depgraph import DependencyGraph, GRAPH_PATH
+from linkindex import output_url
+from outputs import remove_output
+
+LIVERELOAD_PATH = '/__livereload'
+LIVERELOAD_SCRIPT = b'<script>new EventSource("' + LIVERELOAD_PATH.encode() + b'").onmessage = () => location.reload();</script>'
+
+class SiteBuilder:
+    def __init__(self, content_dir, static_dir, template_path, public_dir, basepath, graph_path=None):
+        self.content_dir = os.path.normpath(content_dir)
+        self.static_dir = os.path.normpath(static_dir)
+        self.template_path = os.path.normpath(template_path)
+        self.public_dir = public_dir
+        self.basepath = basepath
+        self.template = load_template(template_path, basepath)
+        # pages missing from the graph count as depending on everything, so an empty graph just means more rebuilding
+        self.graph = DependencyGraph(public_dir) if graph_path is None else DependencyGraph.load(graph_path, public_dir)
+
+    def watched_paths(self):
+        return [self.content_dir, self.static_dir, self.template_path]
+
+    def generate(self, source, dest):
+        references, _ = site.generate_page(source, self.template_path, dest, self.basepath, self.template)
+        self.graph.add_page(dest, source, self.template_path, references)
+
+    def rebuild_all(self):
+        self.template = load_template(self.template_path, self.basepath)
+        outputs = []
+        for source, dest in site.discover_pages(self.content_dir, self.public_dir):
+            self.generate(source, dest)
+            outputs.append(dest)
+        return outputs
+
+    def rebuild_dependents(self, changed):
+        pages = site.discover_pages(self.content_dir, self.public_dir)
+        outputs = []
+        for source, dest in self.graph.affected(pages, changed):
+            self.generate(source, dest)
+            outputs.append(dest)
+        return outputs
+
+    def remove_page(self, source, dest):
+        remove_output(dest, self.public_dir)
+        self.graph.remove_page(dest)
+        for page in sorted(self.graph.dependents(output_url(dest, self.public_dir), ('link',))):
+            print(f'{self.graph.pages[page][0]} links to removed page {source}')
+
+    def remove_static_dir(self, dest):
+        # the outputs under dest that are not pages came from the removed static files
+        removed = []
+        for root, _, names in os.walk(dest):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                if path not in self.graph.pages and not (path.endswith('.gz') and path[:-3] in self.graph.pages):
+                    removed.append(path)
+        for path in removed:
+            remove_output(path, self.public_dir)
+        return removed
+
+    def rebuild(self, paths):
+        outputs = []
+        if self.template_path in paths:
+            # the rest of the batch still has to be handled, e.g. static files changed by the same checkout
+            self.template = load_template(self.template_path, self.basepath)
+            outputs = self.rebuild_dependents([self.template_path])
+        rendered = set(outputs)
+        for path in paths:
+            if path.startswith(self.content_dir + os.sep):
+                dest = os.path.join(self.public_dir, os.path.relpath(path, self.content_dir))
+                if path.endswith('.md'):
+                    dest = dest[:-3] + '.html'
+                    if dest in rendered:
+                        continue
+                    if os.path.isfile(path):
+                        self.generate(path, dest)
+                    else:
+                        self.remove_page(path, dest)
+                    outputs.append(dest)
+                elif not os.path.exists(path) and os.path.isdir(dest):
+                    # a content directory was moved away in one go; its output dir may also hold static files
+                    prefix = path + os.sep
+                    for page, (source, _, _) in sorted(self.graph.pages.items()):
+                        if source.startswith(prefix):
+                            self.remove_page(source, page)
+                            outputs.append(page)
+            elif path.startswith(self.static_dir + os.sep):
+                dest = os.path.join(self.public_dir, os.path.relpath(path, self.static_dir))
+                if os.path.isfile(path):
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    sync_file(path, dest)
+                    outputs.append(dest)
+                    for page in sorted(self.graph.dependents(output_url(dest, self.public_dir), ('image',))):
+                        self.generate(self.graph.pages[page][0], page)
+                        outputs.append(page)
+                    continue
+                elif os.path.isdir(dest) and not os.path.exists(path):
+                    # a static directory was moved away in one go; pages rendered into the same output dir stay
+                    outputs.extend(self.remove_static_dir(dest))
+                    continue
+                elif not os.path.exists(path):
+                    remove_output(dest, self.public_dir)
+                else:
+                    continue
+                outputs.append(dest)
+        return outputs
+
+class ReloadNotifier:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.generation = 0
+
+    def notify(self):
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def wait(self, generation, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.generation != generation, timeout)
+            return self.generation
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    notifier = None
+
+    def do_GET(self):
+        if self.path == LIVERELOAD_PATH:
+            self.send_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split('?', 1)[0].endswith('/'):
+            path = os.path.join(path, 'index.html')
+        if path.endswith('.html') and os.path.isfile(path):
+            self.send_html(path)
+            return
+        super().do_GET()
+
+    def send_html(self, path):
+        with open(path, 'rb') as file:
+            html = file.read()
+        if b'</body>' in html:
+            html = html.replace(b'</body>', LIVERELOAD_SCRIPT + b'</body>', 1)
+        else:
+            html += LIVERELOAD_SCRIPT
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(html)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(html)
+
+    def send_reload_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        generation = self.notifier.generation
+        try:
+            while True:
+                latest = self.notifier.wait(generation, 15)
+                if latest != generation:
+                    self.wfile.write(b'data: reload\n\n')
+                    generation = latest
+                else:
+                    self.wfile.write(b': keep-alive\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(public_dir, host, port, notifier):
+    handler = type('Handler', (DevRequestHandler,), {'notifier': notifier})
+    server = ThreadingHTTPServer((host, port), functools.partial(handler, directory=public_dir))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+def watch_and_rebuild(builder, watcher, notifier):
+    while True:
+        try:
+            paths = watcher.wait()
+            start = time.perf_counter()
+            outputs = builder.rebuild(paths)
+        except OverflowError:
+            start = time.perf_counter()
+            outputs = builder.rebuild_all()
+        except Exception as e:
+            print(f'Rebuild failed: {e}')
+            continue
+        if len(outputs) != 0:
+            notifier.notify()
+            print(f'Rebuilt {len(outputs)} output(s) in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='main.py serve')
+    parser.add_argument('basepath', nargs='?', default='/')
+    parser.add_argument('--watch', action='store_true', help='rebuild changed files and reload connected browsers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8888)
+    return parser.parse_args(argv)
+
+def serve_main(argv):
+    args = parse_args(argv)
+    site.main([args.basepath])
+
+    notifier = ReloadNotifier()
+    server = start_server('docs', args.host, args.port, notifier)
+    print(f'Serving docs at http://{args.host}:{args.port}/')
+    builder = SiteBuilder('content', 'static', 'template.html', 'docs', args.basepath, GRAPH_PATH)
+    watcher = create_watcher(builder.watched_paths()) if args.watch else None
+    try:
+        if watcher is None:
+            threading.Event().wait()
+        else:
+            print(f'Watching {", ".join(builder.watched_paths())} with {type(watcher).__name__}')
+            watch_and_rebuild(builder, watcher, notifier)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.close()
+        server.shutdown()
+
+if __name__ == "__main__":
+    serve_main(sys.argv[1:])
@@ -0,0 +1,189 @@
+import os, sys, json, glob, hashlib, argparse
+
+import buildlog, writer
+from sync import discover_files, SYNC_MODES
+from compress import Compressor
+from images import ImageStage
+from assets import AssetMap, site_path
+from depgraph import DependencyGraph
+from manifest import new_manifest
+from files import save_json
+from linkindex import LinkIndex
+from siteindex import SiteIndex, ListingError, check_listing_paths, SITE_INDEX_PATH, POSTS_SECTION, DEFAULT_PAGE_SIZE
+from outputs import copy_site_static, finish_build, report_dangling
+
+SHARD_MANIFEST_NAME = '.shard-manifest.json'
+SHARD_MANIFEST_VERSION = 3
+
+def parse_shard(value):
+    # "i/N" with 1 <= i <= N
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected i/N, got {value!r}')
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f'shard {value} is out of range')
+    return index, count
+
+def shard_of(path, count):
+    # hashing the content-relative path keeps the partition the same on every machine and every run
+    digest = hashlib.sha256(path.replace(os.sep, '/').encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+def shard_pages(pages, content_dir, index, count):
+    return [(source, dest) for source, dest in pages if shard_of(os.path.relpath(source, content_dir), count) == index]
+
+def shard_dir(public_dir, index, count):
+    return f'{public_dir}.shard-{index}-of-{count}'
+
+def new_shard_manifest(index, count, basepath, template_hash, fingerprint, images=None):
+    # images is the list of variant widths when pages were given image attributes, else None
+    return {
+        'version': SHARD_MANIFEST_VERSION,
+        'shard': index,
+        'shards': count,
+        'basepath': basepath,
+        'template': template_hash,
+        'fingerprint': fingerprint,
+        'images': images,
+        'pages': {},
+    }
+
+def save_shard_manifest(dir, manifest):
+    save_json(os.path.join(dir, SHARD_MANIFEST_NAME), manifest, indent=1, sort_keys=True)
+
+class MergeError(Exception):
+    pass
+
+def load_shard_manifest(dir):
+    path = os.path.join(dir, SHARD_MANIFEST_NAME)
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except OSError as e:
+        raise MergeError(f'{dir} is not a shard output directory: {e.strerror}: {path}')
+    except ValueError as e:
+        raise MergeError(f'{path} is corrupt: {e}')
+    if not isinstance(manifest, dict) or manifest.get('version') != SHARD_MANIFEST_VERSION:
+        raise MergeError(f'{dir} was built by an incompatible version')
+    return manifest
+
+def check_shards(manifests):
+    # every shard must come from the same partition of the same build settings, and each must be present once
+    first = manifests[0]
+    for key in ('shards', 'basepath', 'template', 'fingerprint', 'images'):
+        values = {json.dumps(manifest[key]) for manifest in manifests}
+        if len(values) != 1:
+            raise MergeError(f'shards disagree on {key}: {", ".join(sorted(values))}')
+    indexes = sorted(manifest['shard'] for manifest in manifests)
+    expected = list(range(1, first['shards'] + 1))
+    if indexes != expected:
+        raise MergeError(f'expected shards {expected}, found {indexes}')
+
+def merge_pages(shard_dirs, manifests):
+    # returns {relative dest: (shard dir, page entry)}; the same output from two shards is a conflict unless identical
+    pages = {}
+    conflicts = []
+    for dir, manifest in zip(shard_dirs, manifests):
+        for dest, entry in manifest['pages'].items():
+            if dest in pages and pages[dest][1]['output'] != entry['output']:
+                conflicts.append(f'{dest} differs between {pages[dest][0]} and {dir}')
+                continue
+            pages[dest] = (dir, entry)
+    if len(conflicts) != 0:
+        raise MergeError('conflicting outputs:\n' + '\n'.join(conflicts))
+    return pages
+
+def merge_shards(shard_dirs, public_dir, static_dir, template_path, *, sync_mode='mtime', link=False, site_url=None,
+                 section=POSTS_SECTION, page_size=DEFAULT_PAGE_SIZE, links=None):
+    if len(shard_dirs) == 0:
+        raise MergeError(f'no shard directories found for {public_dir}')
+    manifests = [load_shard_manifest(dir) for dir in shard_dirs]
+    check_shards(manifests)
+    pages = merge_pages(shard_dirs, manifests)
+    first = manifests[0]
+
+    assets = None
+    if first['fingerprint']:
+        assets = AssetMap(static_dir)
+        assets.build()
+    images = None
+    if first['images'] is not None:
+        images = ImageStage(static_dir, first['images'])
+        images.build(first['fingerprint'])
+    static_files = discover_files(static_dir, public_dir)
+    if assets is not None:
+        static_files = [(source, assets.rename(source, dest)) for source, dest in static_files]
+    clashes = sorted(({site_path(dest, public_dir) for _, dest in static_files} |
+                      {name for _, name in ([] if images is None else images.variants)}) & pages.keys())
+    if len(clashes) != 0:
+        raise MergeError('pages overwrite static files: ' + ', '.join(clashes))
+
+    if site_url is not None:
+        check_listing_paths([os.path.join(public_dir, *dest.split('/')) for dest in pages], public_dir, section)
+
+    # static files are copied once here rather than by every shard
+    files, variants, _ = copy_site_static(static_dir, public_dir, sync_mode, link, assets, images)
+
+    # the merged tree gets the same manifest and dependency graph as a single-machine build, so --incremental can follow
+    manifest = new_manifest()
+    manifest['templates'][template_path] = first['template']
+    if images is not None:
+        manifest['images'] = images.attributes
+    graph = DependencyGraph(public_dir)
+    site_index = SiteIndex(public_dir, SiteIndex.load(SITE_INDEX_PATH, public_dir).pages)
+    for dest, (dir, entry) in sorted(pages.items()):
+        path = os.path.join(public_dir, *dest.split('/'))
+        with open(os.path.join(dir, *dest.split('/')), 'rb') as file:
+            size, changed = writer.output.write(path, file.read())
+        buildlog.log.event('page' if changed else 'identical', f'Merging {dest} from {dir}', source=entry['source'], dest=path,
+                           bytes=size if changed else 0)
+        manifest['pages'][path] = {'source': entry['source'], 'hash': entry['hash'], 'basepath': first['basepath'],
+                                   'fingerprint': first['fingerprint']}
+        graph.add_page(path, entry['source'], template_path, entry['references'])
+        site_index.add_record(path, entry['record'])
+        if links is not None:
+            links.add_page(entry['source'], path, [tuple(reference) for reference in entry['references']])
+    finish_build(static_dir, template_path, first['basepath'], files, variants, graph, site_index, links=links, site_url=site_url,
+                 section=section, page_size=page_size, assets=None if assets is None else assets.names,
+                 images=None if images is None else images.attributes, manifest=manifest)
+    return len(pages)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='main.py merge', description='combine --shard outputs into one output directory')
+    parser.add_argument('shard_dirs', nargs='*', help='shard output directories (default: every docs.shard-* directory)')
+    parser.add_argument('--sync-mode', choices=SYNC_MODES, default='mtime')
+    parser.add_argument('--link', action='store_true')
+    parser.add_argument('--links', choices=('warn', 'error', 'off'), default='warn')
+    parser.add_argument('--site-url', metavar='URL', help='write the sitemap, feed and post listings for this site URL')
+    parser.add_argument('--posts', default=POSTS_SECTION, metavar='SECTION')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, metavar='N')
+    parser.add_argument('--gzip', action='store_true', help='write .gz siblings of the merged text outputs')
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('--quiet', '-q', action='store_true')
+    verbosity.add_argument('--verbose', '-v', action='store_true')
+    return parser.parse_args(argv)
+
+def merge_main(argv):
+    args = parse_args(argv)
+    public_dir = 'docs'
+    shard_dirs = args.shard_dirs or sorted(glob.glob(glob.escape(public_dir) + '.shard-*-of-*'))
+    level = buildlog.QUIET if args.quiet else buildlog.VERBOSE if args.verbose else buildlog.SUMMARY
+    log = buildlog.configure(level)
+    compressor = Compressor() if args.gzip else None
+    writer.configure(compressor=compressor)
+    links = None if args.links == 'off' else LinkIndex(public_dir)
+    try:
+        merge_shards(shard_dirs, public_dir, 'static', 'template.html', sync_mode=args.sync_mode, link=args.link, site_url=args.site_url,
+                     section=args.posts, page_size=args.page_size, links=links)
+    except (MergeError, ListingError) as e:
+        log.close()
+        sys.exit(f'merge failed: {e}')
+    finally:
+        if compressor is not None:
+            compressor.close()
+    dangling = 0 if links is None else report_dangling(links)
+    log.summary()
+    log.close()
+    if dangling != 0 and args.links == 'error':
+        sys.exit(1)
@@ -0,0 +1,150 @@
+import os, json, time
+from xml.sax.saxutils import escape, quoteattr
+
+from htmlnode import LeafNode, ParentNode
+from linkindex import output_url
+from manifest import hash_file
+from files import save_json
+
+SITE_INDEX_PATH = os.path.join('.build', 'site-index.json')
+SITE_INDEX_VERSION = 2
+POSTS_SECTION = 'blog'
+DEFAULT_PAGE_SIZE = 10
+FEED_SIZE = 20
+SITEMAP_NAME = 'sitemap.xml'
+FEED_NAME = 'atom.xml'
+
+def timestamp(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+def page_record(source, dest, public_dir, metadata):
+    # what the aggregates need to know about a page, so they can be rebuilt without reading its markdown again
+    return {
+        'source': source,
+        'url': output_url(dest, public_dir),
+        'title': metadata['title'],
+        'words': metadata['words'],
+        'image': metadata['image'],
+        'updated': timestamp(os.stat(source).st_mtime),
+        'hash': hash_file(source),
+    }
+
+class ListingError(Exception):
+    pass
+
+def listing_dir(public_dir, section=POSTS_SECTION):
+    # every listing page but the section's first lives here, so no content page may
+    return os.path.join(public_dir, *section.split('/'), 'page')
+
+def check_listing_paths(dests, public_dir, section=POSTS_SECTION):
+    # run before any page is written, so a clash fails the build rather than overwriting a page
+    prefix = listing_dir(public_dir, section) + os.sep
+    clashes = sorted(dest for dest in dests if dest.startswith(prefix))
+    if len(clashes) != 0:
+        raise ListingError(f'{prefix} is reserved for the {section} listing pages, but pages are generated there: ' + ', '.join(clashes))
+
+def absolute_url(site_url, basepath, url):
+    return site_url.rstrip('/') + basepath + url[1:]
+
+class SiteIndex:
+    # per-page records keyed by output path; saved after every build so incremental builds only
+    # record the pages they render and take the rest from the last build
+    def __init__(self, public_dir, previous=None):
+        self.public_dir = public_dir
+        self.pages = {}
+        # records of the last build, which unchanged pages take their dates from
+        self.previous = previous or {}
+
+    def add_page(self, source, dest, metadata):
+        self.add_record(dest, page_record(source, dest, self.public_dir, metadata))
+
+    def add_record(self, dest, record):
+        # a fresh checkout gives every source the same new mtime, so a page keeps the date of the
+        # last build until its content changes; otherwise the sitemap and feed would change every time
+        old = self.previous.get(dest)
+        if old is not None and old['hash'] == record['hash']:
+            record = dict(record, updated=old['updated'])
+        self.pages[dest] = record
+
+    def home(self):
+        return self.pages.get(os.path.join(self.public_dir, 'index.html'))
+
+    def posts(self, section=POSTS_SECTION):
+        # newest first; the section's own index page is not a post
+        prefix = f'/{section}/'
+        posts = [record for record in self.pages.values() if record['url'].startswith(prefix) and record['url'] != prefix]
+        return sorted(posts, key=lambda record: (record['updated'], record['url']), reverse=True)
+
+    def listing_pages(self, section=POSTS_SECTION, page_size=DEFAULT_PAGE_SIZE):
+        # yields (dest, url, title, content node, newest update) for each page of the section's listing
+        # when the section has an index page of its own, that page keeps /<section>/ and the listing starts at page/1/
+        posts = self.posts(section)
+        chunks = [posts[i:i + page_size] for i in range(0, len(posts), page_size)] or [[]]
+        first = f'/{section}/page/1/' if os.path.join(self.public_dir, *section.split('/'), 'index.html') in self.pages else f'/{section}/'
+        urls = [first] + [f'/{section}/page/{number}/' for number in range(2, len(chunks) + 1)]
+        for number, (chunk, url) in enumerate(zip(chunks, urls), 1):
+            title = section.capitalize() if number == 1 else f'{section.capitalize()} (page {number})'
+            items = [ParentNode('li', [LeafNode('a', record['title'], {'href': record['url']})]) for record in chunk]
+            children = [LeafNode('h1', title), ParentNode('ul', items)]
+            links = []
+            if number > 1:
+                links.append(LeafNode('a', 'Newer posts', {'href': urls[number - 2]}))
+            if number < len(chunks):
+                links.append(LeafNode('a', 'Older posts', {'href': urls[number]}))
+            if len(links) != 0:
+                children.append(ParentNode('nav', links))
+            dest = os.path.join(self.public_dir, *url.strip('/').split('/'), 'index.html')
+            yield dest, url, title, ParentNode('div', children), max((record['updated'] for record in chunk), default=None)
+
+    def sitemap_xml(self, site_url, basepath, listings=()):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        entries = [(record['url'], record['updated']) for record in self.pages.values()]
+        entries.extend((url, updated) for _, url, _, _, updated in listings)
+        for url, updated in sorted(entries):
+            lastmod = '' if updated is None else f'<lastmod>{updated}</lastmod>'
+            lines.append(f'  <url><loc>{escape(absolute_url(site_url, basepath, url))}</loc>{lastmod}</url>')
+        lines.append('</urlset>')
+        return '\n'.join(lines) + '\n'
+
+    def atom_feed(self, site_url, basepath, section=POSTS_SECTION, size=FEED_SIZE):
+        home = self.home()
+        title = section.capitalize() if home is None else home['title']
+        posts = self.posts(section)[:size]
+        site = absolute_url(site_url, basepath, '/')
+        lines = [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            '<feed xmlns="http://www.w3.org/2005/Atom">',
+            f'  <title>{escape(title)}</title>',
+            f'  <id>{escape(site)}</id>',
+            f'  <link href={quoteattr(site)}/>',
+            f'  <link rel="self" href={quoteattr(absolute_url(site_url, basepath, "/" + FEED_NAME))}/>',
+            f'  <updated>{posts[0]["updated"] if len(posts) != 0 else timestamp(0)}</updated>',
+            f'  <author><name>{escape(title)}</name></author>',
+        ]
+        for record in posts:
+            url = absolute_url(site_url, basepath, record['url'])
+            lines.extend([
+                '  <entry>',
+                f'    <title>{escape(record["title"])}</title>',
+                f'    <id>{escape(url)}</id>',
+                f'    <link href={quoteattr(url)}/>',
+                f'    <updated>{record["updated"]}</updated>',
+                '  </entry>',
+            ])
+        lines.append('</feed>')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path=SITE_INDEX_PATH):
+        save_json(path, {'version': SITE_INDEX_VERSION, 'pages': self.pages})
+
+    @classmethod
+    def load(cls, path, public_dir):
+        index = cls(public_dir)
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return index
+        if data.get('version') == SITE_INDEX_VERSION:
+            index.pages = data['pages']
+        return index
@@ -0,0 +1,96 @@
+import os, shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import hash_file
+
+SYNC_MODES = ('mtime', 'hash')
+
+def discover_files(dir, target, extension=None):
+    files = []
+    for root, dirs, names in os.walk(dir):
+        dirs.sort()
+        for name in sorted(names):
+            if extension is not None and not name.endswith(extension):
+                continue
+            source = os.path.join(root, name)
+            dest = os.path.join(target, os.path.relpath(source, dir))
+            files.append((source, dest))
+    return files
+
+def files_match(source, dest, mode):
+    try:
+        dest_stat = os.stat(dest)
+    except FileNotFoundError:
+        return False
+    source_stat = os.stat(source)
+    if os.path.samestat(source_stat, dest_stat):
+        return True
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if mode == 'hash':
+        return hash_file(source) == hash_file(dest)
+    return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+def copy_file(source, dest):
+    tmp_path = dest + '.sync-tmp'
+    try:
+        # copy_file_range lets the kernel copy (or reflink) without a userspace round trip
+        with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining != 0:
+            raise OSError('short copy_file_range')
+    except (AttributeError, OSError):
+        shutil.copyfile(source, tmp_path)
+    # keep the source mtime so the next sync can compare size and mtime
+    shutil.copystat(source, tmp_path)
+    os.replace(tmp_path, dest)
+
+def link_file(source, dest):
+    tmp_path = dest + '.sync-tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.link(source, tmp_path)
+    os.replace(tmp_path, dest)
+
+def sync_file(source, dest, mode='mtime', link=False):
+    if files_match(source, dest, mode):
+        return 'unchanged'
+    if link:
+        try:
+            link_file(source, dest)
+            return 'linked'
+        except OSError:
+            pass
+    copy_file(source, dest)
+    return 'copied'
+
+def sync_tree(source_dir, dest_dir, mode='mtime', link=False, workers=None, on_result=None, rename=None):
+    # rename(source, dest), when given, picks the output path of each file
+    if mode not in SYNC_MODES:
+        raise ValueError(f'unknown sync mode: {mode}')
+    files = discover_files(source_dir, dest_dir)
+    if rename is not None:
+        files = [(source, rename(source, dest)) for source, dest in files]
+    made_dirs = set()
+    for _, dest in files:
+        path = os.path.dirname(dest)
+        if path not in made_dirs:
+            os.makedirs(path, exist_ok=True)
+            made_dirs.add(path)
+    if link:
+        os.makedirs(dest_dir, exist_ok=True)
+        # hard links only work within one filesystem
+        link = os.stat(source_dir).st_dev == os.stat(dest_dir).st_dev
+
+    stats = {'copied': 0, 'linked': 0, 'unchanged': 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (source, dest), result in zip(files, executor.map(lambda file: sync_file(file[0], file[1], mode, link), files)):
+            stats[result] += 1
+            if on_result is not None:
+                on_result(source, dest, result)
+    return files, stats
@@ -0,0 +1,103 @@
+import re, io
+
+SLOT_NAMES = ('Title', 'Content')
+SLOT_PATTERN = re.compile(r'\{\{ (' + '|'.join(SLOT_NAMES) + r') \}\}')
+ROOT_URL_PATTERN = re.compile(r'(href|src)="/([^"?#]*)')
+# an img tag's src (to add its dimensions after), or else any other root URL
+IMAGE_OR_ROOT_URL_PATTERN = re.compile(r'<img src="/([^"?#]*)"|(href|src)="/([^"?#]*)')
+
+class Template:
+    def __init__(self, source, basepath='/', assets=None, images=None):
+        self.basepath = basepath
+        # static paths (relative to the site root) mapped to their fingerprinted names, or None
+        self.assets = assets
+        # static image paths mapped to {'width', 'height', 'variants': [[width, path], ...]}, or None
+        self.images = images
+        self.rewrites = basepath != '/' or assets is not None or images is not None
+        # alternating literal segments and slot names: [literal, slot, literal, ...]
+        self.segments = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self.segments.append(self.rewrite_urls(source[position:match.start()]))
+            self.segments.append(match.group(1))
+            position = match.end()
+        self.segments.append(self.rewrite_urls(source[position:]))
+        self.assets_used = self.find_assets(source)
+        self.images_used = self.find_images(source)
+
+    def rewrite_urls(self, html):
+        if not self.rewrites:
+            return html
+        if self.images is not None:
+            return IMAGE_OR_ROOT_URL_PATTERN.sub(self.rewrite_image, html)
+        return ROOT_URL_PATTERN.sub(self.rewrite_url, html)
+
+    def url(self, path):
+        if self.assets is not None:
+            path = self.assets.get(path, path)
+        return f'{self.basepath}{path}'
+
+    def rewrite_url(self, match):
+        return f'{match.group(1)}="{self.url(match.group(2))}'
+
+    def rewrite_image(self, match):
+        path = match.group(1)
+        if path is None:
+            return f'{match.group(2)}="{self.url(match.group(3))}'
+        image = self.images.get(path)
+        if image is None:
+            return f'<img src="{self.url(path)}"'
+        # sizes are fixed in the tag so the page does not shift as images load
+        attributes = f' width="{image["width"]}" height="{image["height"]}"'
+        if len(image['variants']) != 0:
+            candidates = [f'{self.url(variant)} {width}w' for width, variant in image['variants']]
+            candidates.append(f'{self.url(path)} {image["width"]}w')
+            # without sizes a browser assumes the image spans the viewport and picks too large a candidate
+            attributes += f' srcset="{", ".join(candidates)}" sizes="(max-width: {image["width"]}px) 100vw, {image["width"]}px"'
+        return f'<img src="{self.url(path)}"{attributes}'
+
+    def find_assets(self, source):
+        # fingerprinted names the template itself refers to; pages must be rendered again when one of them changes
+        if self.assets is None:
+            return []
+        return sorted({self.assets[match.group(2)] for match in ROOT_URL_PATTERN.finditer(source) if match.group(2) in self.assets})
+
+    def find_images(self, source):
+        # attributes of the images the template itself shows, which its output changes with
+        if self.images is None:
+            return []
+        return [[path, self.images[path]] for path in sorted({match.group(2) for match in ROOT_URL_PATTERN.finditer(source)})
+                if path in self.images]
+
+    def render(self, **slots):
+        buffer = io.StringIO()
+        self.write(buffer, **slots)
+        return buffer.getvalue()
+
+    def write(self, file, **slots):
+        # slot values are strings or HTMLNodes; nodes are streamed chunk by chunk
+        rewriter = URLRewriter(file, self) if self.rewrites else file
+        for i, segment in enumerate(self.segments):
+            if i % 2 == 0:
+                file.write(segment)
+                continue
+            value = slots[segment]
+            if isinstance(value, str):
+                rewriter.write(value)
+            else:
+                value.write_html(rewriter)
+
+    def __repr__(self):
+        return f'Template({self.basepath}, segments: {self.segments})'
+
+class URLRewriter:
+    def __init__(self, file, template):
+        self.file = file
+        self.template = template
+
+    def write(self, html):
+        return self.file.write(self.template.rewrite_urls(html))
+
+def load_template(template_path, basepath='/', assets=None, images=None):
+    with open(template_path) as file:
+        return Template(file.read(), basepath, assets, images)
@@ -0,0 +1,43 @@
+import unittest, os, json, tempfile
+
+from assets import AssetMap, fingerprinted_name
+from files import write_file
+
+class TestAssetMap(unittest.TestCase):
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name('images/a.png', '0123456789abcdef'), 'images/a.0123456789.png')
+
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static = os.path.join(tmp, 'static')
+            cache_path = os.path.join(tmp, '.build', 'assets.json')
+            write_file(os.path.join(static, 'index.css'), 'body {}')
+            write_file(os.path.join(static, 'images', 'a.png'), 'png')
+            write_file(os.path.join(static, 'robots.txt'), 'User-agent: *')
+
+            names = AssetMap(static, cache_path).build()
+            self.assertEqual(sorted(names), ['images/a.png', 'index.css'])
+            self.assertRegex(names['images/a.png'], r'^images/a\.[0-9a-f]{10}\.png$')
+
+            # unchanged files keep their names
+            self.assertEqual(AssetMap(static, cache_path).build(), names)
+            write_file(os.path.join(static, 'index.css'), 'body { margin: 0; }')
+            changed = AssetMap(static, cache_path).build()
+            self.assertNotEqual(changed['index.css'], names['index.css'])
+            self.assertEqual(changed['images/a.png'], names['images/a.png'])
+            with open(cache_path) as file:
+                self.assertEqual(sorted(json.load(file)), ['images/a.png', 'index.css'])
+
+    def test_rename(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static = os.path.join(tmp, 'static')
+            write_file(os.path.join(static, 'images', 'a.png'), 'png')
+            write_file(os.path.join(static, 'robots.txt'), 'User-agent: *')
+            assets = AssetMap(static, os.path.join(tmp, 'assets.json'))
+            assets.build()
+            dest = assets.rename(os.path.join(static, 'images', 'a.png'), os.path.join('docs', 'images', 'a.png'))
+            self.assertEqual(dest, os.path.join('docs', assets.names['images/a.png']))
+            self.assertEqual(assets.rename(os.path.join(static, 'robots.txt'), os.path.join('docs', 'robots.txt')), os.path.join('docs', 'robots.txt'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest, os, io, json, tempfile
+
+from buildlog import BuildLog, QUIET, SUMMARY, VERBOSE
+
+class TestBuildLog(unittest.TestCase):
+    def test_levels(self):
+        outputs = []
+        for level in (QUIET, SUMMARY, VERBOSE):
+            stream = io.StringIO()
+            log = BuildLog(level, stream=stream)
+            log.event('page', 'Generating page from a.md', bytes=10)
+            log.detail('detail line')
+            log.info('info line')
+            outputs.append(stream.getvalue())
+        self.assertEqual(outputs[0], '')
+        self.assertEqual(outputs[1], 'info line\n')
+        self.assertEqual(outputs[2], 'Generating page from a.md\ndetail line\ninfo line\n')
+
+    def test_summary_line(self):
+        log = BuildLog(stream=io.StringIO())
+        log.event('page', bytes=1024 * 1024)
+        log.event('page', bytes=1024 * 1024)
+        log.event('unchanged', path='docs/index.html')
+        line = log.summary_line()
+        self.assertTrue(line.startswith('Built site: 2 pages rendered, 1 unchanged, 2.00 MiB written in '))
+        self.assertNotIn('removed', line)
+
+    def test_events_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.jsonl')
+            log = BuildLog(QUIET, path, stream=io.StringIO())
+            log.event('page', 'not printed', source='a.md', dest='a.html', bytes=3)
+            log.event('removed', path='old.html')
+            log.close()
+            with open(path) as file:
+                records = [json.loads(line) for line in file]
+        self.assertEqual([record['event'] for record in records], ['page', 'removed'])
+        self.assertEqual(records[0]['bytes'], 3)
+        self.assertEqual(records[1]['path'], 'old.html')
+
+    def test_progress_only_on_tty(self):
+        stream = io.StringIO()
+        log = BuildLog(SUMMARY, stream=stream)
+        log.progress('Generating pages', 1, 2)
+        self.assertEqual(stream.getvalue(), '')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest, os, tempfile
+
+from cache import RenderCache, parser_version
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        cache = RenderCache(self.dir)
+        key = cache.key('# Title')
+        self.assertIsNone(cache.get(key))
+        cache.put(key, {'title': 'Title', 'html': '<div><h1>Title</h1></div>'})
+        self.assertEqual(cache.get(key), {'title': 'Title', 'html': '<div><h1>Title</h1></div>'})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_version_isolation(self):
+        old = RenderCache(self.dir, version='old')
+        old.put(old.key('# Title'), {'title': 'Title', 'html': ''})
+        cache = RenderCache(self.dir)
+        self.assertEqual(cache.version, parser_version())
+        self.assertIsNone(cache.get(cache.key('# Title')))
+        self.assertEqual(cache.remove_old_versions(), 1)
+        self.assertEqual(os.listdir(self.dir), [cache.version])
+
+    def test_evict_least_recently_used(self):
+        cache = RenderCache(self.dir, max_bytes=0)
+        keys = [cache.key(f'# Page {i}') for i in range(3)]
+        for i, key in enumerate(keys):
+            cache.put(key, {'title': f'Page {i}', 'html': 'x' * 100})
+            os.utime(cache.entry_path(key), ns=(i * 10**9, i * 10**9))
+        entry_size = os.path.getsize(cache.entry_path(keys[0]))
+        cache.max_bytes = entry_size * 2
+        # reading the oldest entry makes it the most recently used
+        cache.get(keys[0])
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest, os, gzip, tempfile
+
+from compress import Compressor, compressible, gzip_path
+from files import write_file
+
+class TestCompressor(unittest.TestCase):
+    def test_compressible(self):
+        self.assertTrue(compressible('docs/index.html'))
+        self.assertTrue(compressible('docs/INDEX.CSS'))
+        self.assertFalse(compressible('docs/images/tom.png'))
+        self.assertFalse(compressible('docs/index.html.gz'))
+
+    def test_submit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, 'index.html')
+            image = os.path.join(tmp, 'images', 'tom.png')
+            write_file(page, b'<p>hello</p>' * 100)
+            write_file(image, b'png')
+            compressor = Compressor(2)
+            try:
+                compressor.submit(page)
+                compressor.submit(image)
+                [(path, size)] = compressor.wait()
+                self.assertEqual(path, page)
+                self.assertEqual(os.path.getsize(gzip_path(page)), size)
+                with gzip.open(gzip_path(page)) as file:
+                    self.assertEqual(file.read(), b'<p>hello</p>' * 100)
+                self.assertFalse(os.path.exists(gzip_path(image)))
+
+                # an unchanged file keeps a sibling that is newer than it, and gets one if it has none
+                compressor.submit(page, changed=False)
+                self.assertEqual((compressor.wait(), compressor.skipped), ([], 1))
+                os.remove(gzip_path(page))
+                compressor.submit(page, b'<p>in memory</p>', changed=False)
+                self.assertEqual(len(compressor.wait()), 1)
+                with gzip.open(gzip_path(page)) as file:
+                    self.assertEqual(file.read(), b'<p>in memory</p>')
+            finally:
+                compressor.close()
+            self.assertEqual(sorted(os.listdir(tmp)), ['images', 'index.html', 'index.html.gz'])
+
+    def test_output_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, 'index.html')
+            write_file(page, b'<p>hello</p>')
+            compressor = Compressor(1)
+            outputs = []
+            for _ in range(2):
+                compressor.submit(page)
+                compressor.wait()
+                with open(gzip_path(page), 'rb') as file:
+                    outputs.append(file.read())
+            compressor.close()
+            self.assertEqual(outputs[0], outputs[1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest, os, io, tempfile
+from contextlib import redirect_stdout
+
+import main as site
+from corpus import generate_corpus
+from benchmark import find_baseline
+
+class TestCorpus(unittest.TestCase):
+    def test_generate_and_build(self):
+        with tempfile.TemporaryDirectory() as root:
+            pages = generate_corpus(root, posts=3, huge=1, link_heavy=1, code_heavy=1, huge_size=5)
+            self.assertEqual(pages, 7)
+            self.assertEqual(len(site.discover_pages(os.path.join(root, 'content'), 'docs')), pages)
+            cwd = os.getcwd()
+            os.chdir(root)
+            try:
+                with redirect_stdout(io.StringIO()):
+                    site.main([])
+            finally:
+                os.chdir(cwd)
+            with open(os.path.join(root, 'docs', 'blog', 'post2', 'index.html')) as file:
+                self.assertIn('<title>Post 2</title>', file.read())
+
+    def test_same_seed_same_corpus(self):
+        with tempfile.TemporaryDirectory() as first, tempfile.TemporaryDirectory() as second:
+            generate_corpus(first, posts=2, huge=0, link_heavy=1, code_heavy=1, seed=7)
+            generate_corpus(second, posts=2, huge=0, link_heavy=1, code_heavy=1, seed=7)
+            for path in ('blog/post1/index.md', 'links/page0/index.md', 'code/page0/index.md'):
+                with open(os.path.join(first, 'content', path)) as a, open(os.path.join(second, 'content', path)) as b:
+                    self.assertEqual(a.read(), b.read())
+
+    def test_find_baseline(self):
+        records = [{'commit': 'abc123'}, {'commit': 'def456'}, {'commit': None}]
+        self.assertEqual(find_baseline(records, None), {'commit': None})
+        self.assertEqual(find_baseline(records, 'abc'), {'commit': 'abc123'})
+        self.assertIsNone(find_baseline(records, 'fff'))
+
+if __name__ == "__main__":
+    unittest.main()
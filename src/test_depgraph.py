@@ -0,0 +1,55 @@
+import unittest, os, tempfile
+
+from depgraph import DependencyGraph
+
+class TestDependencyGraph(unittest.TestCase):
+    def make_graph(self):
+        graph = DependencyGraph('docs')
+        graph.add_page(os.path.join('docs', 'index.html'), 'content/index.md', 'template.html', [
+            ('image', '/images/cover.png'),
+            ('link', '/blog/post'),
+        ])
+        graph.add_page(os.path.join('docs', 'blog', 'post', 'index.html'), 'content/blog/post/index.md', 'template.html', [
+            ('image', '../../images/tom.png'),
+            ('link', '/'),
+            ('link', 'https://example.com/'),
+        ])
+        return graph
+
+    def test_dependents(self):
+        graph = self.make_graph()
+        home = os.path.join('docs', 'index.html')
+        post = os.path.join('docs', 'blog', 'post', 'index.html')
+        self.assertEqual(graph.dependents('template.html'), {home, post})
+        self.assertEqual(graph.dependents('/images/cover.png'), {home})
+        self.assertEqual(graph.dependents('/images/tom.png'), {post})
+        # links do not change what a page renders to
+        self.assertEqual(graph.dependents('/blog/post/'), set())
+        self.assertEqual(graph.dependents('/blog/post/', ('link',)), {home})
+        self.assertEqual(graph.dependents('/', ('link',)), {post})
+
+    def test_affected(self):
+        graph = self.make_graph()
+        pages = [
+            ('content/index.md', os.path.join('docs', 'index.html')),
+            ('content/blog/post/index.md', os.path.join('docs', 'blog', 'post', 'index.html')),
+            ('content/new.md', os.path.join('docs', 'new.html')),
+        ]
+        self.assertEqual(graph.affected(pages, ['/images/tom.png']), pages[1:])
+        self.assertEqual(graph.affected(pages, ['template.html']), pages)
+
+    def test_save_and_load(self):
+        graph = self.make_graph()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, '.build', 'depgraph.bin')
+            graph.save(path)
+            loaded = DependencyGraph.load(path, 'docs')
+            self.assertEqual(loaded.pages, graph.pages)
+
+            with open(path, 'wb') as file:
+                file.write(b'not a graph')
+            self.assertEqual(DependencyGraph.load(path, 'docs').pages, {})
+            self.assertEqual(DependencyGraph.load(os.path.join(tmp, 'missing.bin'), 'docs').pages, {})
+
+if __name__ == "__main__":
+    unittest.main()
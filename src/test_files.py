@@ -0,0 +1,33 @@
+import unittest, os, json, tempfile
+
+from files import write_atomic, save_json, write_file
+
+class TestFiles(unittest.TestCase):
+    def test_save_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, '.build', 'state.json')
+            save_json(path, {'b': 1, 'a': [2]}, indent=1, sort_keys=True)
+            with open(path) as file:
+                text = file.read()
+            self.assertEqual(json.loads(text), {'a': [2], 'b': 1})
+            self.assertLess(text.index('"a"'), text.index('"b"'))
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['state.json'])
+
+    def test_failed_write_leaves_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state.json')
+            write_atomic(path, b'old')
+            with self.assertRaises(TypeError):
+                write_atomic(path, 'not bytes')
+            with open(path, 'rb') as file:
+                self.assertEqual(file.read(), b'old')
+            self.assertEqual(os.listdir(tmp), ['state.json'])
+
+    def test_write_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, 'a', 'b.txt'), 'text')
+            write_file(os.path.join(tmp, 'a', 'c.bin'), b'\x00\x01')
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp, 'a'))), ['b.txt', 'c.bin'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,4 @@
-import unittest
+import unittest, io
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
@@ -96,5 +96,18 @@ class TestHTMLNode(unittest.TestCase):
         parent_node = ParentNode("div", None)
         self.assertRaises(ValueError)
 
+    def test_write_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "Normal text"), LeafNode("a", "link", {"href": "/"})]),
+                LeafNode("code", "x = 1"),
+            ],
+        )
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), '<div><p>Normal text<a href="/">link</a></p><code>x = 1</code></div>')
+        self.assertEqual(buffer.getvalue(), node.to_html())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import unittest, os, random, struct, tempfile
+
+from images import (ImageStage, decode_png, encode_png, image_size, parse_widths, resize_png, resize_rows, variant_path)
+
+def noise_png(width, height):
+    # random RGB pixels, so a downscaled copy is always smaller than the original
+    generator = random.Random(width * height)
+    rows = [bytes(generator.randrange(256) for _ in range(width * 3)) for _ in range(height)]
+    return encode_png(width, height, 2, rows)
+
+class TestImageSize(unittest.TestCase):
+    def test_headers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = {
+                'a.png': noise_png(5, 3),
+                'a.gif': b'GIF89a' + struct.pack('<HH', 7, 2) + bytes(20),
+                # SOI, an APP0 segment to seek over, then a baseline frame header
+                'a.jpg': b'\xff\xd8' + b'\xff\xe0' + struct.pack('>H', 6) + b'JFIF' +
+                         b'\xff\xc0' + struct.pack('>HBHH', 11, 8, 40, 30) + bytes(6),
+                'a.txt': b'not an image',
+            }
+            sizes = {}
+            for name, data in files.items():
+                path = os.path.join(tmp, name)
+                with open(path, 'wb') as file:
+                    file.write(data)
+                sizes[name] = image_size(path)
+            self.assertEqual(sizes, {'a.png': (5, 3), 'a.gif': (7, 2), 'a.jpg': (30, 40), 'a.txt': None})
+
+class TestResize(unittest.TestCase):
+    def test_round_trip(self):
+        rows = [bytes([y, 2 * y, 3 * y, 255 - y, 0, 1]) for y in range(3)]
+        self.assertEqual(decode_png(encode_png(2, 3, 2, rows)), (2, 3, 2, rows))
+
+    def test_resize_rows(self):
+        # each output pixel averages the 2x2 box it covers
+        rows = [bytes([0, 4, 8, 12]), bytes([2, 6, 10, 14])]
+        self.assertEqual(resize_rows(rows, 4, 2, 1, 2, 1), [bytes([3, 11])])
+
+    def test_resize_png(self):
+        variants = resize_png(noise_png(40, 20), [10, 40, 80])
+        self.assertEqual(list(variants), [10])
+        self.assertEqual(decode_png(variants[10])[:3], (10, 5, 2))
+
+    def test_parse_widths(self):
+        self.assertEqual(parse_widths('480,960'), (480, 960))
+        with self.assertRaises(Exception):
+            parse_widths('0')
+
+    def test_variant_path(self):
+        self.assertEqual(variant_path('images/a.png', 480), 'images/a-480w.png')
+
+class TestImageStage(unittest.TestCase):
+    def test_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            static = os.path.join(tmp, 'static')
+            os.makedirs(os.path.join(static, 'images'))
+            with open(os.path.join(static, 'images', 'a.png'), 'wb') as file:
+                file.write(noise_png(40, 20))
+            with open(os.path.join(static, 'index.css'), 'w') as file:
+                file.write('body {}')
+
+            def stage(widths):
+                stage = ImageStage(static, widths, os.path.join(tmp, 'images.json'), os.path.join(tmp, 'variants'))
+                stage.build()
+                return stage
+
+            first = stage((10,))
+            self.assertEqual(first.processed, 1)
+            self.assertEqual(first.attributes, {'images/a.png': {'width': 40, 'height': 20, 'variants': [[10, 'images/a-10w.png']]}})
+            self.assertEqual([name for _, name in first.variants], ['images/a-10w.png'])
+
+            # a cached image is not read again, and only new widths are resized
+            self.assertEqual(stage((10,)).processed, 0)
+            self.assertEqual(stage(()).attributes['images/a.png']['variants'], [])
+            wider = stage((10, 20))
+            self.assertEqual(wider.processed, 1)
+            self.assertEqual([width for width, _ in wider.attributes['images/a.png']['variants']], [10, 20])
+            self.assertEqual(len(os.listdir(os.path.join(tmp, 'variants'))), 2)
+
+            # variants of a removed image are pruned
+            os.remove(os.path.join(static, 'images', 'a.png'))
+            self.assertEqual(stage((10, 20)).attributes, {})
+            self.assertEqual(os.listdir(os.path.join(tmp, 'variants')), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest, os
+
+from linkindex import LinkIndex, output_url
+
+class TestLinkIndex(unittest.TestCase):
+    def test_output_url(self):
+        self.assertEqual(output_url(os.path.join('docs', 'index.html'), 'docs'), '/')
+        self.assertEqual(output_url(os.path.join('docs', 'blog', 'post', 'index.html'), 'docs'), '/blog/post/')
+        self.assertEqual(output_url(os.path.join('docs', 'images', 'a.png'), 'docs'), '/images/a.png')
+
+    def test_dangling(self):
+        index = LinkIndex('docs')
+        index.add_output(os.path.join('docs', 'images', 'tom.png'))
+        index.add_page('content/index.md', os.path.join('docs', 'index.html'), [
+            ('link', '/'),
+            ('link', '/blog/post'),
+            ('link', '/blog/post/#comments'),
+            ('link', '/blog/missing'),
+            ('image', '/images/tom.png'),
+            ('image', '/images/gone.png'),
+            ('link', 'https://example.com/nope'),
+            ('link', 'mailto:someone@example.com'),
+            ('link', '#top'),
+        ])
+        index.add_page('content/blog/post/index.md', os.path.join('docs', 'blog', 'post', 'index.html'), [
+            ('link', '../..'),
+            ('image', '../../images/tom.png'),
+            ('link', 'sibling'),
+        ])
+        self.assertEqual(list(index.dangling()), [
+            ('content/index.md', 'link', '/blog/missing'),
+            ('content/index.md', 'image', '/images/gone.png'),
+            ('content/blog/post/index.md', 'link', 'sibling'),
+        ])
+        self.assertEqual(index.reference_count(), 12)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,12 @@
-import unittest
+import unittest, os, io, re, shutil, tempfile
+from contextlib import redirect_stdout
 
-from main import extract_title
+from main import extract_title, build_incremental, discover_pages, generate_pages, parse_document, parse_page_stream, parse_page_cached
+from cache import RenderCache
+from assets import AssetMap
+from siteindex import ListingError
+import buildlog
+from files import write_file
 
 class TestHTMLNode(unittest.TestCase):
     def test_extract_title(self):
@@ -21,5 +27,210 @@ Another line of text
             extract_title(markdown)
         self.assertEqual(str(result.exception), 'No title found')
 
+    def test_parse_page_stream(self):
+        markdown = 'Intro text\n\n# The title\n\n```\ncode\n\nmore code\n```\n\n- item'
+        title, node, metadata = parse_page_stream(io.StringIO(markdown))
+        self.assertEqual(title, 'The title')
+        expected_title, expected_node, expected_metadata = parse_document(markdown)
+        self.assertEqual(title, expected_title)
+        self.assertEqual(node.to_html(), expected_node.to_html())
+        # the metadata is only complete once every block has been written
+        self.assertEqual(metadata, expected_metadata)
+
+    def test_parse_page_stream_no_title(self):
+        with self.assertRaises(Exception) as result:
+            parse_page_stream(io.StringIO('## Not a title\n\ntext'))
+        self.assertEqual(str(result.exception), 'No title found')
+
+    def test_parse_page_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = RenderCache(tmp)
+            markdown = '# Title\n\nSome [link](/about)'
+            first = parse_page_cached(markdown, cache)
+            second = parse_page_cached(markdown, cache)
+            self.assertEqual(first, ('Title', '<div><h1>Title</h1><p>Some <a href="/about">link</a></p></div>',
+                                     {'title': 'Title', 'outline': [(1, 'Title')], 'words': 3, 'image': None}))
+            self.assertEqual(second, first)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_discover_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, 'content', 'index.md'), '# Home')
+            write_file(os.path.join(tmp, 'content', 'blog', 'post', 'index.md'), '# Post')
+            write_file(os.path.join(tmp, 'content', 'notes.txt'), 'not a page')
+            pages = discover_pages(os.path.join(tmp, 'content'), os.path.join(tmp, 'docs'))
+            self.assertEqual(pages, [
+                (os.path.join(tmp, 'content', 'index.md'), os.path.join(tmp, 'docs', 'index.html')),
+                (os.path.join(tmp, 'content', 'blog', 'post', 'index.md'), os.path.join(tmp, 'docs', 'blog', 'post', 'index.html')),
+            ])
+
+    def test_build_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            static = os.path.join(tmp, 'static')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            manifest = os.path.join(tmp, '.build', 'manifest.json')
+            graph = os.path.join(tmp, '.build', 'depgraph.bin')
+            write_file(template, '<title>{{ Title }}</title>{{ Content }}')
+            write_file(os.path.join(content, 'index.md'), '# Home')
+            write_file(os.path.join(content, 'blog', 'index.md'), '# Blog')
+            write_file(os.path.join(static, 'index.css'), 'body {}')
+
+            with redirect_stdout(io.StringIO()):
+                self.check_build_incremental(content, static, template, docs, manifest, graph)
+
+    def check_build_incremental(self, content, static, template, docs, manifest, graph):
+        build = lambda basepath='/': build_incremental(content, static, template, docs, basepath, manifest, graph_path=graph,
+                                                       index_path=os.path.join(os.path.dirname(graph), 'site-index.json'))
+        stats = build()
+        self.assertEqual((stats['rendered'], stats['copied'], stats['unchanged']), (2, 1, 0))
+
+        stats = build()
+        self.assertEqual((stats['rendered'], stats['copied'], stats['unchanged']), (0, 0, 3))
+
+        write_file(os.path.join(content, 'index.md'), '# Home again')
+        os.remove(os.path.join(content, 'blog', 'index.md'))
+        stats = build()
+        self.assertEqual((stats['rendered'], stats['removed'], stats['unchanged']), (1, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(docs, 'blog')))
+        with open(os.path.join(docs, 'index.html')) as file:
+            self.assertEqual(file.read(), '<title>Home again</title><div><h1>Home again</h1></div>')
+
+        stats = build('/site/')
+        self.assertEqual(stats['rendered'], 1)
+
+    def test_build_incremental_dependencies(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            static = os.path.join(tmp, 'static')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            write_file(template, '{{ Content }}')
+            write_file(os.path.join(content, 'index.md'), '# Home\n\n![cover](/images/cover.png)')
+            write_file(os.path.join(content, 'about', 'index.md'), '# About\n\n[home](/)')
+            write_file(os.path.join(static, 'images', 'cover.png'), 'png')
+            build = lambda: build_incremental(content, static, template, docs, '/', os.path.join(tmp, 'manifest.json'),
+                                              graph_path=os.path.join(tmp, 'depgraph.bin'), index_path=os.path.join(tmp, 'site-index.json'))
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(build()['rendered'], 2)
+
+                # only the page showing the image depends on it
+                write_file(os.path.join(static, 'images', 'cover.png'), 'new png')
+                self.assertEqual(build()['rendered'], 1)
+
+                write_file(template, '<main>{{ Content }}</main>')
+                self.assertEqual(build()['rendered'], 2)
+                self.assertEqual(build()['rendered'], 0)
+
+    def test_build_incremental_fingerprinted_links(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            static = os.path.join(tmp, 'static')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            write_file(template, '{{ Content }}')
+            write_file(os.path.join(content, 'index.md'), '# Home\n\n[see](/images/a.png)')
+            write_file(os.path.join(content, 'about', 'index.md'), '# About')
+            write_file(os.path.join(static, 'images', 'a.png'), 'png')
+
+            def build():
+                assets = AssetMap(static, os.path.join(tmp, 'assets.json'))
+                assets.build()
+                return build_incremental(content, static, template, docs, '/', os.path.join(tmp, 'manifest.json'),
+                                         graph_path=os.path.join(tmp, 'depgraph.bin'), index_path=os.path.join(tmp, 'site-index.json'),
+                                         assets=assets)
+
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(build()['rendered'], 2)
+
+                # a page that only links to a fingerprinted file must pick up its new name
+                write_file(os.path.join(static, 'images', 'a.png'), 'new png')
+                self.assertEqual(build()['rendered'], 1)
+                with open(os.path.join(docs, 'index.html')) as file:
+                    href = re.search(r'href="/(images/[^"]*)"', file.read()).group(1)
+                self.assertTrue(os.path.exists(os.path.join(docs, *href.split('/'))))
+
+    def test_build_incremental_aggregates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            write_file(template, '<title>{{ Title }}</title>{{ Content }}')
+            write_file(os.path.join(content, 'index.md'), '# Home')
+            for i in range(3):
+                write_file(os.path.join(content, 'blog', f'post{i}', 'index.md'), f'# Post {i}')
+                os.utime(os.path.join(content, 'blog', f'post{i}', 'index.md'), (1000 * i, 1000 * i))
+            build = lambda: build_incremental(content, os.path.join(tmp, 'static'), template, docs, '/site/',
+                                              os.path.join(tmp, 'manifest.json'), graph_path=os.path.join(tmp, 'depgraph.bin'),
+                                              index_path=os.path.join(tmp, 'site-index.json'),
+                                              site_url='https://example.com', page_size=2)
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(build()['rendered'], 4)
+                with open(os.path.join(docs, 'blog', 'index.html')) as file:
+                    self.assertEqual(file.read(), '<title>Blog</title><div><h1>Blog</h1><ul><li><a href="/site/blog/post2/">Post 2</a></li>'
+                                     '<li><a href="/site/blog/post1/">Post 1</a></li></ul><nav><a href="/site/blog/page/2/">Older posts</a></nav></div>')
+                with open(os.path.join(docs, 'sitemap.xml')) as file:
+                    self.assertIn('<loc>https://example.com/site/blog/page/2/</loc><lastmod>1970-01-01T00:00:00Z</lastmod>', file.read())
+
+                # the listings are rebuilt from the saved metadata; only the changed post is read and rendered
+                write_file(os.path.join(content, 'blog', 'post0', 'index.md'), '# Post 0, revised')
+                self.assertEqual(build()['rendered'], 1)
+                with open(os.path.join(docs, 'atom.xml')) as file:
+                    feed = file.read()
+                self.assertLess(feed.index('Post 0, revised'), feed.index('Post 2'))
+                self.assertIn('<title>Home</title>', feed)
+
+                shutil.rmtree(os.path.join(content, 'blog', 'post1'))
+                self.assertEqual(build()['removed'], 2)
+                self.assertFalse(os.path.exists(os.path.join(docs, 'blog', 'page')))
+
+    def test_build_incremental_section_index_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            write_file(template, '<title>{{ Title }}</title>{{ Content }}')
+            write_file(os.path.join(content, 'blog', 'index.md'), '# About the blog')
+            write_file(os.path.join(content, 'blog', 'post', 'index.md'), '# Post')
+            build = lambda: build_incremental(content, os.path.join(tmp, 'static'), template, docs, '/',
+                                              os.path.join(tmp, 'manifest.json'), graph_path=os.path.join(tmp, 'depgraph.bin'),
+                                              index_path=os.path.join(tmp, 'site-index.json'), site_url='https://example.com')
+            with redirect_stdout(io.StringIO()):
+                build()
+                with open(os.path.join(docs, 'blog', 'index.html')) as file:
+                    self.assertEqual(file.read(), '<title>About the blog</title><div><h1>About the blog</h1></div>')
+                with open(os.path.join(docs, 'blog', 'page', '1', 'index.html')) as file:
+                    self.assertIn('<a href="/blog/post/">Post</a>', file.read())
+
+                # content where the listings go is refused before anything is written
+                write_file(os.path.join(content, 'blog', 'page', '2', 'index.md'), '# Clash')
+                with self.assertRaises(ListingError):
+                    build()
+                self.assertFalse(os.path.exists(os.path.join(docs, 'blog', 'page', '2', 'index.html')))
+
+    def test_generate_pages_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, 'template.html')
+            write_file(template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+            for i in range(8):
+                write_file(os.path.join(tmp, 'content', f'post{i}', 'index.md'), f'# Post {i}\n\n[home](/) and **bold** {i}')
+            outputs = []
+            for jobs in (1, 3):
+                docs = os.path.join(tmp, f'docs{jobs}')
+                pages = discover_pages(os.path.join(tmp, 'content'), docs)
+                log = io.StringIO()
+                buildlog.configure(buildlog.VERBOSE, stream=log)
+                generate_pages(pages, template, '/site/', jobs)
+                buildlog.configure()
+                contents = []
+                for _, dest in pages:
+                    with open(dest) as file:
+                        contents.append(file.read())
+                outputs.append((contents, log.getvalue().replace(docs, 'docs')))
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertIn('<a href="/site/">home</a>', outputs[0][0][0])
+            self.assertIn('Generating page from', outputs[0][1])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
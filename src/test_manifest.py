@@ -0,0 +1,35 @@
+import unittest, os, tempfile
+
+from manifest import MANIFEST_VERSION, hash_file, hash_bytes, load_manifest, save_manifest, new_manifest
+
+class TestManifest(unittest.TestCase):
+    def test_hash_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'page.md')
+            with open(path, 'wb') as file:
+                file.write(b'# Title')
+            self.assertEqual(hash_file(path), hash_bytes(b'# Title'))
+
+    def test_missing_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(load_manifest(os.path.join(tmp, 'manifest.json')), new_manifest())
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, '.build', 'manifest.json')
+            manifest = new_manifest()
+            manifest['pages']['docs/index.html'] = {'source': 'content/index.md', 'hash': 'abc', 'template': 'def', 'basepath': '/'}
+            save_manifest(path, manifest)
+            self.assertEqual(load_manifest(path), manifest)
+
+    def test_version_mismatch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'manifest.json')
+            manifest = new_manifest()
+            manifest['version'] = MANIFEST_VERSION + 1
+            manifest['pages']['docs/index.html'] = {}
+            save_manifest(path, manifest)
+            self.assertEqual(load_manifest(path), new_manifest())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
-import unittest
+import unittest, io
 
-from markdown_blocks import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from markdown_blocks import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node, iter_blocks, block_to_html_node, block_memo_info, set_block_memo_size, BLOCK_MEMO_SIZE, BLOCK_MEMO_MAX_CHARS, collect_references, markdown_to_document, outline_to_html_node
+from htmlnode import FragmentNode
 
 class TestHTMLNode(unittest.TestCase):
     def test_b2bt_para(self):
@@ -27,6 +28,26 @@ class TestHTMLNode(unittest.TestCase):
         block = '1. First thing'
         self.assertEqual(block_to_block_type(block), BlockType.ORDERED_LIST)
 
+    def test_b2bt_paragraph_with_markers(self):
+        block = 'I write C# and - sometimes - Python\nthen 1. thing > other ```code```'
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_b2bt_too_many_hashes(self):
+        block = '####### Not a heading'
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_b2bt_mixed_quote(self):
+        block = '> quoted\nnot quoted'
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_b2bt_mixed_unordered(self):
+        block = '- item\nnot an item'
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
+    def test_b2bt_ordered_out_of_order(self):
+        block = '1. First thing\n3. Third thing'
+        self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
+
     def test_markdown_to_blocks(self):
         md = '''
 This is **bolded** paragraph
@@ -68,6 +89,35 @@ This is the same paragraph on a new line
             ],
         )
 
+    def test_markdown_to_blocks_code_with_blank_lines(self):
+        md = '''
+Intro paragraph
+
+```
+first line
+
+third line
+```
+
+After the code
+'''
+        blocks = markdown_to_blocks(md)
+        self.assertEqual(
+            blocks,
+            [
+                'Intro paragraph',
+                '```\nfirst line\n\nthird line\n```',
+                'After the code',
+            ],
+        )
+
+    def test_iter_blocks_from_file(self):
+        file = io.StringIO('# Title\n\n\nSome text\non two lines\n\n```one line code```\n- item\n')
+        self.assertEqual(
+            list(iter_blocks(file)),
+            ['# Title', 'Some text\non two lines', '```one line code```\n- item'],
+        )
+
     def test_m2h_paragraphs(self):
         md = '''
 This is **bolded** paragraph
@@ -169,5 +219,88 @@ the **same** even with inline stuff
             "<div><ol><li>Item 1</li><li>Item 2</li><li>Item 3</li></ol></div>",
         )
 
+    def test_block_memo(self):
+        set_block_memo_size(2)
+        try:
+            first = block_to_html_node('This is a **repeated** disclaimer')
+            second = block_to_html_node('This is a **repeated** disclaimer')
+            self.assertIs(first, second)
+            self.assertIsInstance(first, FragmentNode)
+            self.assertEqual(first.to_html(), '<p>This is a <b>repeated</b> disclaimer</p>')
+            self.assertEqual(first.children[0].tag, 'p')
+            info = block_memo_info()
+            self.assertEqual((info.hits, info.misses, info.maxsize), (1, 1, 2))
+
+            block_to_html_node('## Heading one')
+            block_to_html_node('## Heading two')
+            self.assertEqual(block_memo_info().currsize, 2)
+
+            long_block = 'x' * (BLOCK_MEMO_MAX_CHARS + 1)
+            self.assertEqual(block_to_html_node(long_block).tag, 'p')
+            self.assertEqual(block_memo_info().misses, 3)
+        finally:
+            set_block_memo_size(BLOCK_MEMO_SIZE)
+
+    def test_collect_references(self):
+        md = """# Title with [a link](/about)
+
+- ![cover](/images/cover.png)
+- [post](/blog/post)
+
+Plain paragraph"""
+        expected = [('link', '/about'), ('image', '/images/cover.png'), ('link', '/blog/post')]
+        set_block_memo_size(16)
+        try:
+            # the second pass is served from the memo and must report the same references
+            for _ in range(2):
+                with collect_references() as references:
+                    markdown_to_html_node(md)
+                self.assertEqual(references, expected)
+            self.assertEqual(block_memo_info().hits, 3)
+        finally:
+            set_block_memo_size(BLOCK_MEMO_SIZE)
+
+    def test_markdown_to_document(self):
+        md = """# Title
+
+Intro with ![first](/a.png) and ![second](/b.png)
+
+## Setup
+
+- one two
+- three
+
+```
+# not a heading
+```
+
+### Details **bold**
+
+## Usage
+1. run it"""
+        node, metadata = markdown_to_document(md)
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        self.assertEqual(metadata['title'], 'Title')
+        self.assertEqual(metadata['outline'], [(1, 'Title'), (2, 'Setup'), (3, 'Details **bold**'), (2, 'Usage')])
+        # words of the rendered text: code lines count in full, and so does the "1." the heading block runs on into,
+        # but image alt text does not
+        self.assertEqual(metadata['words'], 18)
+        self.assertEqual(metadata['image'], '/a.png')
+
+    def test_word_count_skips_markers(self):
+        for md, words in (('see ** a ** b', 3), ('![alt text here](/i.png)', 0), ('**bo**ld [a link](/x) `co de`', 5)):
+            self.assertEqual(markdown_to_document('# T\n\n' + md)[1]['words'], 1 + words, md)
+
+    def test_markdown_to_document_without_title(self):
+        _, metadata = markdown_to_document('## Only a section\n\ntext')
+        self.assertIsNone(metadata['title'])
+        self.assertIsNone(metadata['image'])
+
+    def test_outline_to_html_node(self):
+        outline = [(1, 'Title'), (2, 'Setup'), (3, 'Details **bold**'), (2, 'Usage'), (4, 'Deep'), (3, 'Back')]
+        self.assertEqual(outline_to_html_node(outline).to_html(),
+            '<ul><li>Title<ul><li>Setup<ul><li>Details <b>bold</b></li></ul></li>'
+            '<li>Usage<ul><li>Deep</li><li>Back</li></ul></li></ul></li></ul>')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import unittest, os, io, tempfile
+from contextlib import redirect_stdout
+
+from outputs import prune_output, finish_build
+from depgraph import DependencyGraph
+from linkindex import LinkIndex
+from manifest import new_manifest, load_manifest
+from siteindex import SiteIndex
+from files import write_file
+
+class TestOutputs(unittest.TestCase):
+    def test_prune_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = os.path.join(tmp, 'docs')
+            keep = [os.path.join(docs, 'index.html'), os.path.join(docs, 'blog', 'post', 'index.html')]
+            for path in keep + [os.path.join(docs, 'old.html'), os.path.join(docs, 'gone', 'deep', 'index.html')]:
+                write_file(path, 'x')
+            self.assertEqual(prune_output(docs, keep), 2)
+            self.assertEqual(sorted(os.listdir(docs)), ['blog', 'index.html'])
+            self.assertTrue(os.path.exists(keep[1]))
+
+    def finish(self, tmp, manifest=None, old_manifest=None, links=None):
+        docs = os.path.join(tmp, 'docs')
+        static = os.path.join(tmp, 'static')
+        template = os.path.join(tmp, 'template.html')
+        write_file(template, '<title>{{ Title }}</title>{{ Content }}')
+        source = os.path.join(tmp, 'content', 'index.md')
+        write_file(source, '# Home')
+        write_file(os.path.join(docs, 'index.html'), 'home')
+        write_file(os.path.join(docs, 'index.css'), 'body {}')
+        graph = DependencyGraph(docs)
+        graph.add_page(os.path.join(docs, 'index.html'), source, template, [])
+        index = SiteIndex(docs)
+        index.add_page(source, os.path.join(docs, 'index.html'), {'title': 'Home', 'words': 1, 'image': None})
+        files = [(os.path.join(static, 'index.css'), os.path.join(docs, 'index.css'))]
+        with redirect_stdout(io.StringIO()):
+            return finish_build(static, template, '/', files, [], graph, index, links=links, site_url='https://example.com', manifest=manifest,
+                                old_manifest=old_manifest, manifest_path=os.path.join(tmp, 'manifest.json'),
+                                graph_path=os.path.join(tmp, 'depgraph.bin'), index_path=os.path.join(tmp, 'site-index.json'))
+
+    def test_finish_build_prunes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, 'docs', 'stale.html'), 'old')
+            links = LinkIndex(os.path.join(tmp, 'docs'))
+            self.assertEqual(self.finish(tmp, links=links), 1)
+            self.assertEqual(sorted(os.listdir(os.path.join(tmp, 'docs'))), ['atom.xml', 'blog', 'index.css', 'index.html', 'sitemap.xml'])
+            self.assertEqual(sorted(os.listdir(tmp)), ['content', 'depgraph.bin', 'docs', 'site-index.json', 'template.html'])
+            self.assertEqual(list(links.dangling()), [])
+
+    def test_finish_build_removes_unowned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            docs = os.path.join(tmp, 'docs')
+            # only outputs the last manifest owned are removed; other files in the output dir stay
+            write_file(os.path.join(docs, 'gone.html'), 'old')
+            write_file(os.path.join(docs, 'CNAME'), 'example.com')
+            old_manifest = new_manifest()
+            old_manifest['pages'][os.path.join(docs, 'gone.html')] = {}
+            manifest = new_manifest()
+            self.assertEqual(self.finish(tmp, manifest, old_manifest), 1)
+            self.assertEqual(sorted(os.listdir(docs)), ['CNAME', 'atom.xml', 'blog', 'index.css', 'index.html', 'sitemap.xml'])
+            saved = load_manifest(os.path.join(tmp, 'manifest.json'))
+            self.assertEqual(list(saved['static']), [os.path.join(docs, 'index.css')])
+            self.assertEqual(sorted(saved['generated']), [os.path.join(docs, 'atom.xml'), os.path.join(docs, 'blog', 'index.html'),
+                                                          os.path.join(docs, 'sitemap.xml')])
+
+if __name__ == "__main__":
+    unittest.main()
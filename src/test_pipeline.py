@@ -0,0 +1,54 @@
+import unittest, os, time, tempfile, threading
+
+import pipeline
+from pipeline import PagePipeline
+
+class TestPagePipeline(unittest.TestCase):
+    def write_pages(self, tmp, count):
+        pages = []
+        for i in range(count):
+            source = os.path.join(tmp, 'content', f'page{i}.md')
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            with open(source, 'w') as file:
+                file.write(f'page {i}')
+            pages.append((source, os.path.join(tmp, 'docs', f'page{i}.html')))
+        return pages
+
+    def test_pages_finish_in_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = self.write_pages(tmp, 20)
+            finished = []
+            on_page = lambda from_path, dest_path, size, changed, info: finished.append((from_path, dest_path, changed, info))
+            results = PagePipeline(lambda markdown: (markdown.upper().encode(), len(markdown)), 3, on_page).run(pages)
+            self.assertEqual(finished, [(source, dest, True, len(f'page {i}')) for i, (source, dest) in enumerate(pages)])
+            self.assertEqual(len(results), 20)
+            for i, (_, dest) in enumerate(pages):
+                with open(dest) as file:
+                    self.assertEqual(file.read(), f'PAGE {i}')
+
+            results = PagePipeline(lambda markdown: (markdown.upper().encode(), None), 3).run(pages)
+            self.assertEqual({changed for _, changed in results}, {False})
+
+    def test_concurrency_limit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = self.write_pages(tmp, 12)
+            lock = threading.Lock()
+            active = [0, 0]
+            read_text = pipeline.read_text
+            def slow_read(path):
+                with lock:
+                    active[0] += 1
+                    active[1] = max(active[1], active[0])
+                time.sleep(0.01)
+                with lock:
+                    active[0] -= 1
+                return read_text(path)
+            pipeline.read_text = slow_read
+            try:
+                PagePipeline(lambda markdown: (markdown.encode(), None), 2).run(pages)
+            finally:
+                pipeline.read_text = read_text
+            self.assertLessEqual(active[1], 2)
+
+if __name__ == "__main__":
+    unittest.main()
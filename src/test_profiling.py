@@ -0,0 +1,72 @@
+import unittest, os, io, json, tempfile
+from contextlib import redirect_stdout, redirect_stderr
+
+from profiling import BuildProfiler, PAGE_STAGES
+from template import Template
+from main import profile_page, build_profiled, parse_args
+
+class TestProfiling(unittest.TestCase):
+    def test_stage_totals(self):
+        profiler = BuildProfiler()
+        with profiler.stage('discovery'):
+            pass
+        profiler.start_page('content/a.md', 'docs/a.html')
+        with profiler.stage('read'):
+            pass
+        with profiler.stage('read'):
+            pass
+        page = profiler.pages[0]
+        self.assertEqual(page['seconds'], page['stages']['read']['seconds'])
+        self.assertEqual(profiler.page_stages['read']['seconds'], page['stages']['read']['seconds'])
+        self.assertEqual(profiler.page_stages['write']['seconds'], 0.0)
+        self.assertGreater(profiler.build_stages['discovery']['seconds'], 0.0)
+
+    def test_profile_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'index.md')
+            dest = os.path.join(tmp, 'docs', 'index.html')
+            with open(source, 'w') as file:
+                file.write('# Home\n\nSome **bold** text\n\n- a\n- b')
+            profiler = BuildProfiler()
+            profile_page(source, dest, Template('<title>{{ Title }}</title>{{ Content }}'), profiler)
+            with open(dest) as file:
+                self.assertEqual(file.read(), '<title>Home</title><div><h1>Home</h1><p>Some <b>bold</b> text</p><ul><li>a</li><li>b</li></ul></div>')
+            self.assertEqual(list(profiler.pages[0]['stages']), list(PAGE_STAGES))
+
+            report_path = os.path.join(tmp, 'profile.json')
+            profiler.write_json(report_path)
+            with open(report_path) as file:
+                report = json.load(file)
+            self.assertEqual(report['pages_total'], 1)
+            self.assertEqual(report['pages'][0]['source'], source)
+            self.assertIn(source, profiler.format_table())
+
+    def test_build_profiled_keeps_unchanged_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            static = os.path.join(tmp, 'static')
+            docs = os.path.join(tmp, 'docs')
+            template = os.path.join(tmp, 'template.html')
+            for path, text in ((os.path.join(content, 'index.md'), '# Home'), (os.path.join(static, 'index.css'), 'body {}'),
+                               (template, '{{ Content }}'), (os.path.join(docs, 'old.html'), 'stale')):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as file:
+                    file.write(text)
+            build = lambda: build_profiled(content, static, template, docs, '/', BuildProfiler(),
+                                           manifest_path=os.path.join(tmp, 'manifest.json'))
+            with redirect_stdout(io.StringIO()):
+                build()
+                self.assertEqual(sorted(os.listdir(docs)), ['index.css', 'index.html'])
+                os.utime(os.path.join(docs, 'index.html'), ns=(1, 1))
+                build()
+            self.assertEqual(os.stat(os.path.join(docs, 'index.html')).st_mtime_ns, 1)
+
+    def test_profile_rejects_other_modes(self):
+        for flags in (['--jobs', '2'], ['--stream'], ['--cache'], ['--pipeline'], ['--fingerprint'], ['--site-url', 'https://x.org'],
+                      ['--incremental'], ['--gzip'], ['--images']):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                parse_args(['--profile'] + flags)
+        self.assertIsNotNone(parse_args(['--profile', '--sync-mode', 'hash']).profile)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest, os, io, shutil, tempfile, urllib.request
+from contextlib import redirect_stdout
+
+from serve import SiteBuilder, ReloadNotifier, start_server, LIVERELOAD_SCRIPT
+from files import write_file
+
+class TestServe(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, 'content')
+        self.static = os.path.join(self.root, 'static')
+        self.docs = os.path.join(self.root, 'docs')
+        self.template = os.path.join(self.root, 'template.html')
+        write_file(self.template, '<title>{{ Title }}</title><body>{{ Content }}</body>')
+        write_file(os.path.join(self.content, 'index.md'), '# Home')
+        write_file(os.path.join(self.content, 'blog', 'index.md'), '# Blog')
+        write_file(os.path.join(self.static, 'index.css'), 'body {}')
+        self.builder = SiteBuilder(self.content, self.static, self.template, self.docs, '/')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rebuild(self, paths):
+        with redirect_stdout(io.StringIO()):
+            return self.builder.rebuild(paths)
+
+    def test_rebuild_page(self):
+        path = os.path.join(self.content, 'blog', 'index.md')
+        self.assertEqual(self.rebuild([path]), [os.path.join(self.docs, 'blog', 'index.html')])
+        self.assertEqual(read_file(os.path.join(self.docs, 'blog', 'index.html')), '<title>Blog</title><body><div><h1>Blog</h1></div></body>')
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'index.html')))
+
+        os.remove(path)
+        self.rebuild([path])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'blog')))
+
+    def test_rebuild_static(self):
+        path = os.path.join(self.static, 'index.css')
+        self.assertEqual(self.rebuild([path]), [os.path.join(self.docs, 'index.css')])
+        self.assertEqual(read_file(os.path.join(self.docs, 'index.css')), 'body {}')
+
+    def test_rebuild_image_dependents(self):
+        write_file(os.path.join(self.content, 'blog', 'index.md'), '# Blog\n\n![tom](/images/tom.png)')
+        write_file(os.path.join(self.static, 'images', 'tom.png'), 'png')
+        with redirect_stdout(io.StringIO()):
+            self.builder.rebuild_all()
+        path = os.path.join(self.static, 'images', 'tom.png')
+        self.assertEqual(self.rebuild([path]), [os.path.join(self.docs, 'images', 'tom.png'), os.path.join(self.docs, 'blog', 'index.html')])
+
+    def test_rebuild_template(self):
+        write_file(self.template, '<main>{{ Content }}</main>')
+        outputs = self.rebuild([os.path.normpath(self.template)])
+        self.assertEqual(len(outputs), 2)
+        self.assertEqual(read_file(os.path.join(self.docs, 'index.html')), '<main><div><h1>Home</h1></div></main>')
+
+    def test_rebuild_template_with_static(self):
+        write_file(self.template, '<main>{{ Content }}</main>')
+        write_file(os.path.join(self.static, 'new.css'), 'p {}')
+        paths = [os.path.normpath(self.template), os.path.join(self.static, 'index.css'), os.path.join(self.static, 'new.css'),
+                 os.path.join(self.content, 'index.md')]
+        outputs = self.rebuild(paths)
+        self.assertEqual(sorted(outputs), sorted([os.path.join(self.docs, 'index.html'), os.path.join(self.docs, 'blog', 'index.html'),
+                                                  os.path.join(self.docs, 'index.css'), os.path.join(self.docs, 'new.css')]))
+        self.assertEqual(read_file(os.path.join(self.docs, 'new.css')), 'p {}')
+
+    def test_remove_shared_directory(self):
+        # static/blog and content/blog both write into docs/blog; removing one tree leaves the other's outputs
+        write_file(os.path.join(self.static, 'blog', 'style.css'), 'p {}')
+        write_file(os.path.join(self.content, 'blog', 'post', 'index.md'), '# Post')
+        with redirect_stdout(io.StringIO()):
+            self.builder.rebuild_all()
+        self.rebuild([os.path.join(self.static, 'blog', 'style.css')])
+
+        shutil.rmtree(os.path.join(self.static, 'blog'))
+        self.assertEqual(self.rebuild([os.path.join(self.static, 'blog')]), [os.path.join(self.docs, 'blog', 'style.css')])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'blog', 'style.css')))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'blog', 'post', 'index.html')))
+
+        write_file(os.path.join(self.static, 'blog', 'style.css'), 'p {}')
+        self.rebuild([os.path.join(self.static, 'blog', 'style.css')])
+        shutil.rmtree(os.path.join(self.content, 'blog'))
+        self.assertEqual(sorted(self.rebuild([os.path.join(self.content, 'blog')])),
+                         [os.path.join(self.docs, 'blog', 'index.html'), os.path.join(self.docs, 'blog', 'post', 'index.html')])
+        self.assertEqual(os.listdir(os.path.join(self.docs, 'blog')), ['style.css'])
+
+    def test_server_injects_reload_script(self):
+        self.rebuild([os.path.join(self.content, 'index.md')])
+        server = start_server(self.docs, '127.0.0.1', 0, ReloadNotifier())
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/') as response:
+                html = response.read()
+            self.assertEqual(html, b'<title>Home</title><body><div><h1>Home</h1></div>' + LIVERELOAD_SCRIPT + b'</body>')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def read_file(path):
+    with open(path) as file:
+        return file.read()
+
+if __name__ == "__main__":
+    unittest.main()
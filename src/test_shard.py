@@ -0,0 +1,82 @@
+import unittest, os, sys, argparse, subprocess, tempfile
+
+from shard import parse_shard, shard_of, shard_pages, check_shards, merge_pages, new_shard_manifest, load_shard_manifest, MergeError, SHARD_MANIFEST_NAME
+from files import write_file
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class TestShard(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for value in ('0/4', '5/4', '1/0', 'x', '1/2/3'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_partition(self):
+        pages = [(os.path.join('content', f'post{i}', 'index.md'), f'post{i}.html') for i in range(50)]
+        shards = [shard_pages(pages, 'content', i, 3) for i in (1, 2, 3)]
+        self.assertEqual(sorted(sum(shards, [])), sorted(pages))
+        self.assertTrue(all(len(shard) != 0 for shard in shards))
+        self.assertEqual(shard_of('blog/post/index.md', 7), shard_of('blog/post/index.md', 7))
+
+    def test_check_shards(self):
+        manifests = [new_shard_manifest(i, 3, '/', 'abc', False) for i in (1, 3)]
+        with self.assertRaises(MergeError):
+            check_shards(manifests)
+        manifests.append(new_shard_manifest(2, 3, '/site/', 'abc', False))
+        with self.assertRaises(MergeError):
+            check_shards(manifests)
+        manifests[2]['basepath'] = '/'
+        check_shards(manifests)
+
+    def test_merge_conflict(self):
+        first = new_shard_manifest(1, 2, '/', 'abc', False)
+        second = new_shard_manifest(2, 2, '/', 'abc', False)
+        first['pages']['index.html'] = {'source': 'content/index.md', 'output': '1'}
+        second['pages']['index.html'] = {'source': 'content/index.md', 'output': '1'}
+        self.assertEqual(list(merge_pages(['a', 'b'], [first, second])), ['index.html'])
+        second['pages']['index.html']['output'] = '2'
+        with self.assertRaises(MergeError):
+            merge_pages(['a', 'b'], [first, second])
+
+    def test_load_shard_manifest_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaisesRegex(MergeError, 'not a shard output directory'):
+                load_shard_manifest(os.path.join(tmp, 'missing'))
+            write_file(os.path.join(tmp, SHARD_MANIFEST_NAME), '{"version": ')
+            with self.assertRaisesRegex(MergeError, 'corrupt'):
+                load_shard_manifest(tmp)
+
+    def test_shards_in_separate_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, 'template.html'), '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+            write_file(os.path.join(tmp, 'static', 'index.css'), 'body {}')
+            for i in range(12):
+                write_file(os.path.join(tmp, 'content', 'blog', f'post{i}', 'index.md'), f'# Post {i}\n\n[home](/) and [next](/blog/post{i + 1})')
+            write_file(os.path.join(tmp, 'content', 'index.md'), '# Home\n\n[first](/blog/post0)')
+            main = os.path.join(SRC_DIR, 'main.py')
+            run = lambda *args: subprocess.run([sys.executable, main, *args], cwd=tmp, capture_output=True, text=True, check=True)
+
+            run('/site/', '-q')
+            expected = read_tree(os.path.join(tmp, 'docs'))
+            processes = [subprocess.Popen([sys.executable, main, '/site/', '-q', '--shard', f'{i}/3'], cwd=tmp) for i in (1, 2, 3)]
+            self.assertEqual([process.wait() for process in processes], [0, 0, 0])
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'docs.shard-1-of-3', 'index.css')))
+
+            write_file(os.path.join(tmp, 'docs', 'stale.html'), 'old')
+            result = run('merge')
+            self.assertEqual(read_tree(os.path.join(tmp, 'docs')), expected)
+            # post11 links to a post12 that no shard built
+            self.assertIn('Dangling link in content/blog/post11/index.md: /blog/post12', result.stdout)
+            self.assertIn('0 pages rendered', run('/site/', '--incremental').stdout)
+
+def read_tree(dir):
+    tree = {}
+    for root, _, names in os.walk(dir):
+        for name in names:
+            with open(os.path.join(root, name)) as file:
+                tree[os.path.relpath(os.path.join(root, name), dir)] = file.read()
+    return tree
+
+if __name__ == "__main__":
+    unittest.main()
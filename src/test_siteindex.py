@@ -0,0 +1,105 @@
+import unittest, os, json, tempfile
+
+from siteindex import SiteIndex, ListingError, check_listing_paths, SITE_INDEX_VERSION
+
+def record(url, title, updated):
+    return {'source': 'content' + url + 'index.md', 'url': url, 'title': title, 'words': 1, 'image': None, 'updated': updated,
+            'hash': title}
+
+class TestSiteIndex(unittest.TestCase):
+    def make_index(self):
+        index = SiteIndex('docs')
+        for dest, url, title, updated in (
+            ('docs/index.html', '/', 'Home & Away', '2024-01-01T00:00:00Z'),
+            ('docs/blog/old/index.html', '/blog/old/', 'Old', '2024-01-02T00:00:00Z'),
+            ('docs/blog/new/index.html', '/blog/new/', 'New <post>', '2024-03-01T00:00:00Z'),
+            ('docs/contact/index.html', '/contact/', 'Contact', '2024-02-01T00:00:00Z'),
+        ):
+            index.pages[os.path.join(*dest.split('/'))] = record(url, title, updated)
+        return index
+
+    def test_posts(self):
+        index = self.make_index()
+        self.assertEqual([post['url'] for post in index.posts()], ['/blog/new/', '/blog/old/'])
+        self.assertEqual(index.posts('notes'), [])
+
+    def test_listing_pages(self):
+        listings = list(self.make_index().listing_pages(page_size=1))
+        self.assertEqual([(dest, url, title) for dest, url, title, _, _ in listings], [
+            (os.path.join('docs', 'blog', 'index.html'), '/blog/', 'Blog'),
+            (os.path.join('docs', 'blog', 'page', '2', 'index.html'), '/blog/page/2/', 'Blog (page 2)'),
+        ])
+        self.assertEqual(listings[1][3].to_html(),
+            '<div><h1>Blog (page 2)</h1><ul><li><a href="/blog/old/">Old</a></li></ul><nav><a href="/blog/">Newer posts</a></nav></div>')
+        self.assertEqual(listings[1][4], '2024-01-02T00:00:00Z')
+        # an empty section still gets its first listing page
+        self.assertEqual(len(list(SiteIndex('docs').listing_pages())), 1)
+
+    def test_listing_after_section_index_page(self):
+        # the section's own page keeps /blog/, so the listing starts at page 1
+        index = self.make_index()
+        index.pages[os.path.join('docs', 'blog', 'index.html')] = record('/blog/', 'Blog', '2024-01-01T00:00:00Z')
+        listings = list(index.listing_pages(page_size=1))
+        self.assertEqual([url for _, url, _, _, _ in listings], ['/blog/page/1/', '/blog/page/2/'])
+        self.assertEqual(listings[0][0], os.path.join('docs', 'blog', 'page', '1', 'index.html'))
+        self.assertIn('<a href="/blog/page/1/">Newer posts</a>', listings[1][3].to_html())
+
+    def test_check_listing_paths(self):
+        check_listing_paths([os.path.join('docs', 'blog', 'index.html'), os.path.join('docs', 'blog', 'page.html')], 'docs')
+        with self.assertRaises(ListingError):
+            check_listing_paths([os.path.join('docs', 'blog', 'page', '2', 'index.html')], 'docs')
+
+    def test_sitemap_xml(self):
+        index = self.make_index()
+        sitemap = index.sitemap_xml('https://example.com/', '/site/', list(index.listing_pages()))
+        self.assertIn('<url><loc>https://example.com/site/</loc><lastmod>2024-01-01T00:00:00Z</lastmod></url>', sitemap)
+        self.assertIn('<url><loc>https://example.com/site/blog/</loc><lastmod>2024-03-01T00:00:00Z</lastmod></url>', sitemap)
+        self.assertEqual(sitemap.count('<url>'), 5)
+
+    def test_atom_feed(self):
+        feed = self.make_index().atom_feed('https://example.com', '/')
+        self.assertIn('<title>Home &amp; Away</title>', feed)
+        self.assertIn('<updated>2024-03-01T00:00:00Z</updated>', feed)
+        self.assertIn('<title>New &lt;post&gt;</title>', feed)
+        self.assertLess(feed.index('/blog/new/'), feed.index('/blog/old/'))
+        self.assertNotIn('/contact/', feed)
+
+    def test_updated_kept_for_unchanged_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'content', 'blog', 'post', 'index.md')
+            dest = os.path.join(tmp, 'docs', 'blog', 'post', 'index.html')
+            os.makedirs(os.path.dirname(source))
+            with open(source, 'w') as file:
+                file.write('# Post')
+            os.utime(source, (1000, 1000))
+            metadata = {'title': 'Post', 'words': 1, 'image': None}
+            first = SiteIndex(os.path.join(tmp, 'docs'))
+            first.add_page(source, dest, metadata)
+            self.assertEqual(first.pages[dest]['updated'], '1970-01-01T00:16:40Z')
+
+            # a fresh checkout touches the file without changing it
+            os.utime(source, (5000, 5000))
+            second = SiteIndex(os.path.join(tmp, 'docs'), first.pages)
+            second.add_page(source, dest, metadata)
+            self.assertEqual(second.pages[dest]['updated'], '1970-01-01T00:16:40Z')
+
+            with open(source, 'w') as file:
+                file.write('# Post, revised')
+            os.utime(source, (5000, 5000))
+            third = SiteIndex(os.path.join(tmp, 'docs'), second.pages)
+            third.add_page(source, dest, metadata)
+            self.assertEqual(third.pages[dest]['updated'], '1970-01-01T01:23:20Z')
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, '.build', 'site-index.json')
+            index = self.make_index()
+            index.save(path)
+            self.assertEqual(SiteIndex.load(path, 'docs').pages, index.pages)
+            with open(path, 'w') as file:
+                json.dump({'version': SITE_INDEX_VERSION + 1, 'pages': index.pages}, file)
+            self.assertEqual(SiteIndex.load(path, 'docs').pages, {})
+            self.assertEqual(SiteIndex.load(os.path.join(tmp, 'missing.json'), 'docs').pages, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest, os, tempfile
+
+from sync import sync_tree, sync_file, files_match
+from files import write_file
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, 'static')
+        self.docs = os.path.join(self.tmp.name, 'docs')
+        write_file(os.path.join(self.static, 'index.css'), 'body {}')
+        write_file(os.path.join(self.static, 'images', 'a.png'), 'png bytes')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sync_tree(self):
+        files, stats = sync_tree(self.static, self.docs)
+        self.assertEqual(files, [
+            (os.path.join(self.static, 'index.css'), os.path.join(self.docs, 'index.css')),
+            (os.path.join(self.static, 'images', 'a.png'), os.path.join(self.docs, 'images', 'a.png')),
+        ])
+        self.assertEqual(stats, {'copied': 2, 'linked': 0, 'unchanged': 0})
+        self.assertEqual(read_file(os.path.join(self.docs, 'images', 'a.png')), 'png bytes')
+
+        _, stats = sync_tree(self.static, self.docs)
+        self.assertEqual(stats, {'copied': 0, 'linked': 0, 'unchanged': 2})
+
+        write_file(os.path.join(self.static, 'index.css'), 'body { margin: 0 }')
+        _, stats = sync_tree(self.static, self.docs)
+        self.assertEqual(stats, {'copied': 1, 'linked': 0, 'unchanged': 1})
+        self.assertEqual(read_file(os.path.join(self.docs, 'index.css')), 'body { margin: 0 }')
+
+    def test_hash_mode(self):
+        source = os.path.join(self.static, 'index.css')
+        dest = os.path.join(self.docs, 'index.css')
+        write_file(dest, 'body {}')
+        self.assertFalse(files_match(source, dest, 'mtime'))
+        self.assertTrue(files_match(source, dest, 'hash'))
+        self.assertEqual(sync_file(source, dest, 'hash'), 'unchanged')
+
+    def test_link(self):
+        _, stats = sync_tree(self.static, self.docs, link=True)
+        self.assertEqual(stats, {'copied': 0, 'linked': 2, 'unchanged': 0})
+        self.assertTrue(os.path.samefile(os.path.join(self.static, 'index.css'), os.path.join(self.docs, 'index.css')))
+        _, stats = sync_tree(self.static, self.docs, link=True)
+        self.assertEqual(stats, {'copied': 0, 'linked': 0, 'unchanged': 2})
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            sync_tree(self.static, self.docs, 'size')
+
+def read_file(path):
+    with open(path) as file:
+        return file.read()
+
+if __name__ == "__main__":
+    unittest.main()
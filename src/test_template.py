@@ -0,0 +1,62 @@
+import unittest, io
+
+from template import Template
+from htmlnode import ParentNode, LeafNode
+
+class TestTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = Template('<title>{{ Title }}</title><article>{{ Content }}</article>')
+        self.assertEqual(template.segments, ['<title>', 'Title', '</title><article>', 'Content', '</article>'])
+
+    def test_render(self):
+        template = Template('<title>{{ Title }}</title><article>{{ Content }}</article>')
+        self.assertEqual(
+            template.render(Title='Hello', Content='<p>world</p>'),
+            '<title>Hello</title><article><p>world</p></article>',
+        )
+
+    def test_basepath_rewritten_once(self):
+        template = Template('<link href="/index.css" />{{ Content }}', '/site/')
+        self.assertEqual(template.segments[0], '<link href="/site/index.css" />')
+        self.assertEqual(
+            template.render(Title='', Content='<a href="/blog">blog</a><img src="/images/a.png" alt="a"></img>'),
+            '<link href="/site/index.css" /><a href="/site/blog">blog</a><img src="/site/images/a.png" alt="a"></img>',
+        )
+
+    def test_unknown_placeholder_kept(self):
+        template = Template('{{ Title }} {{ Author }}')
+        self.assertEqual(template.render(Title='Hi', Content=''), 'Hi {{ Author }}')
+
+    def test_write_node(self):
+        template = Template('<title>{{ Title }}</title>{{ Content }}', '/site/')
+        node = ParentNode('p', [LeafNode('a', 'home', {'href': '/'}), LeafNode(None, ' text')])
+        buffer = io.StringIO()
+        template.write(buffer, Title='Home', Content=node)
+        self.assertEqual(buffer.getvalue(), '<title>Home</title><p><a href="/site/">home</a> text</p>')
+
+    def test_fingerprinted_assets(self):
+        assets = {'index.css': 'index.0123456789.css', 'images/a.png': 'images/a.abcdef0123.png'}
+        template = Template('<link href="/index.css?v=1" />{{ Content }}', '/site/', assets)
+        self.assertEqual(template.assets_used, ['index.0123456789.css'])
+        self.assertEqual(
+            template.render(Title='', Content='<img src="/images/a.png" alt="a"></img><a href="/images/b.png">b</a>'),
+            '<link href="/site/index.0123456789.css?v=1" /><img src="/site/images/a.abcdef0123.png" alt="a"></img><a href="/site/images/b.png">b</a>',
+        )
+
+    def test_image_attributes(self):
+        images = {
+            'images/a.png': {'width': 960, 'height': 480, 'variants': [[480, 'images/a-480w.png']]},
+            'logo.gif': {'width': 32, 'height': 32, 'variants': []},
+        }
+        template = Template('<img src="/logo.gif" />{{ Content }}', '/site/', images=images)
+        self.assertEqual(template.images_used, [['logo.gif', images['logo.gif']]])
+        self.assertEqual(
+            template.render(Title='', Content='<img src="/images/a.png" alt="a"></img><a href="/images/a.png">a</a>'),
+            '<img src="/site/logo.gif" width="32" height="32" />'
+            '<img src="/site/images/a.png" width="960" height="480" srcset="/site/images/a-480w.png 480w, /site/images/a.png 960w" '
+            'sizes="(max-width: 960px) 100vw, 960px" alt="a"></img>'
+            '<a href="/site/images/a.png">a</a>',
+        )
+
+if __name__ == "__main__":
+    unittest.main()
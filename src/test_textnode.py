@@ -150,5 +150,46 @@ class TestTextNode(unittest.TestCase):
             ]
         )
 
+    def test_text_to_textnodes_leading_image(self):
+        nodes = text_to_textnodes('![tolkien](/images/tolkien.png)')
+        self.assertEqual(nodes, [TextNode('tolkien', TextType.TEXT_IMAGE, '/images/tolkien.png')])
+
+    def test_text_to_textnodes_link_with_underscores(self):
+        nodes = text_to_textnodes('see [the_docs](https://example.com/a_b) and `x_y`')
+        self.assertEqual(nodes,
+            [
+                TextNode('see ', TextType.TEXT_PLAIN),
+                TextNode('the_docs', TextType.TEXT_LINK, 'https://example.com/a_b'),
+                TextNode(' and ', TextType.TEXT_PLAIN),
+                TextNode('x_y', TextType.TEXT_CODE),
+            ]
+        )
+
+    def test_text_to_textnodes_unmatched_bracket(self):
+        nodes = text_to_textnodes('a [b] **c**')
+        self.assertEqual(nodes,
+            [
+                TextNode('a [b] ', TextType.TEXT_PLAIN),
+                TextNode('c', TextType.TEXT_BOLD),
+            ]
+        )
+
+    def test_text_to_textnodes_bracket_before_link(self):
+        nodes = text_to_textnodes('Footnote [1] is **important**, see [docs](/docs).')
+        self.assertEqual(nodes,
+            [
+                TextNode('Footnote [1] is ', TextType.TEXT_PLAIN),
+                TextNode('important', TextType.TEXT_BOLD),
+                TextNode(', see ', TextType.TEXT_PLAIN),
+                TextNode('docs', TextType.TEXT_LINK, '/docs'),
+                TextNode('.', TextType.TEXT_PLAIN),
+            ]
+        )
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        with self.assertRaises(Exception) as result:
+            text_to_textnodes('an _unclosed italic')
+        self.assertEqual(str(result.exception), 'Wrong number of delimeters')
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import unittest, os, tempfile
+
+from watch import PollingWatcher, InotifyWatcher
+from files import write_file
+
+class TestWatch(unittest.TestCase):
+    def check_watcher(self, create):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, 'content')
+            template = os.path.join(tmp, 'template.html')
+            os.makedirs(content)
+            write_file(os.path.join(content, 'index.md'), '# Home')
+            write_file(template, '{{ Content }}')
+            write_file(os.path.join(tmp, 'unrelated.txt'), 'ignored')
+            watcher = create([content, template])
+            try:
+                self.assertEqual(watcher.wait(0.05), [])
+
+                write_file(os.path.join(content, 'index.md'), '# Home, edited')
+                write_file(os.path.join(tmp, 'unrelated.txt'), 'still ignored')
+                self.assertEqual(watcher.wait(2), [os.path.join(content, 'index.md')])
+
+                write_file(template, '<main>{{ Content }}</main>')
+                self.assertEqual(watcher.wait(2), [template])
+
+                os.makedirs(os.path.join(content, 'blog'))
+                write_file(os.path.join(content, 'blog', 'post.md'), '# Post')
+                changed = watcher.wait(2)
+                self.assertIn(os.path.join(content, 'blog', 'post.md'), changed)
+
+                os.remove(os.path.join(content, 'index.md'))
+                self.assertIn(os.path.join(content, 'index.md'), watcher.wait(2))
+            finally:
+                watcher.close()
+
+    def test_polling(self):
+        self.check_watcher(lambda paths: PollingWatcher(paths, 0.01))
+
+    def test_inotify(self):
+        try:
+            InotifyWatcher([]).close()
+        except (OSError, AttributeError):
+            self.skipTest('inotify is not available')
+        self.check_watcher(InotifyWatcher)
+
+if __name__ == "__main__":
+    unittest.main()
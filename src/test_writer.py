@@ -0,0 +1,80 @@
+import unittest, os, tempfile
+
+from writer import OutputWriter
+from compress import Compressor, gzip_path
+
+class TestOutputWriter(unittest.TestCase):
+    def test_skips_identical_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'blog', 'index.html')
+            output = OutputWriter()
+            self.assertEqual(output.write(path, b'<p>hello</p>'), (12, True))
+            os.utime(path, ns=(1, 1))
+            self.assertEqual(output.write(path, b'<p>hello</p>'), (12, False))
+            self.assertEqual(os.stat(path).st_mtime_ns, 1)
+            self.assertEqual(output.write(path, b'<p>world</p>'), (12, True))
+            with open(path) as file:
+                self.assertEqual(file.read(), '<p>world</p>')
+            self.assertEqual((output.written, output.unchanged), (2, 1))
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['index.html'])
+
+    def test_compressed_siblings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.html')
+            compressor = Compressor(1)
+            output = OutputWriter(compressor=compressor)
+            output.write(path, b'<p>hello</p>')
+            self.assertEqual([page for page, _ in compressor.wait()], [path])
+            output.write(path, b'<p>hello</p>')
+            self.assertEqual((compressor.wait(), compressor.skipped), ([], 1))
+            compressor.close()
+            # without a compressor, a changed file drops the sibling that no longer matches it
+            output = OutputWriter()
+            output.write(path, b'<p>hello</p>')
+            self.assertTrue(os.path.exists(gzip_path(path)))
+            output.write(path, b'<p>world</p>')
+            self.assertFalse(os.path.exists(gzip_path(path)))
+
+    def test_write_stream(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.html')
+            output = OutputWriter()
+            self.assertEqual(output.write_stream(path, lambda file: file.write('abc')), (3, True))
+            os.utime(path, ns=(1, 1))
+            self.assertEqual(output.write_stream(path, lambda file: file.write('abc')), (3, False))
+            self.assertEqual(os.stat(path).st_mtime_ns, 1)
+            self.assertEqual(os.listdir(tmp), ['index.html'])
+
+    def test_write_stream_matches_write(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.html')
+            output = OutputWriter()
+            text = '<p>caf\u00e9\r\n\u2014</p>\n'
+            output.write(path, text.encode())
+            self.assertEqual(output.write_stream(path, lambda file: file.write(text)), (len(text.encode()), False))
+
+    def test_failed_stream_leaves_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'index.html')
+            output = OutputWriter()
+            output.write(path, b'old')
+            def fail(file):
+                file.write('partial')
+                raise ValueError('render failed')
+            with self.assertRaises(ValueError):
+                output.write_stream(path, fail)
+            with open(path) as file:
+                self.assertEqual(file.read(), 'old')
+            self.assertEqual(os.listdir(tmp), ['index.html'])
+
+    def test_sync_batches_changed_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = OutputWriter(fsync=True)
+            output.write(os.path.join(tmp, 'a.html'), b'a')
+            output.write(os.path.join(tmp, 'a.html'), b'a')
+            output.write(os.path.join(tmp, 'b', 'b.html'), b'b')
+            self.assertEqual(output.sync(), 2)
+            self.assertEqual(output.sync(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
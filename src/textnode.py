@@ -12,6 +12,8 @@ class TextType(Enum):
     TEXT_IMAGE = 'image'
 
 class TextNode:
+    __slots__ = ('text', 'text_type', 'url')
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -108,11 +110,49 @@ def split_nodes_link(old_nodes):
         new_nodes.extend(nodes_to_add)
     return new_nodes
 
+INLINE_DELIMITERS = {
+    '**': TextType.TEXT_BOLD,
+    '_': TextType.TEXT_ITALIC,
+    '`': TextType.TEXT_CODE,
+}
+INLINE_TOKEN_PATTERN = re.compile(r'\*\*|_|`|!\[|\[')
+# text and URL stay inside one bracket pair, so a bare [x] cannot run on into a later link
+IMAGE_PATTERN = re.compile(r'!\[([^\[\]]*)\]\(([^()]*)\)')
+LINK_PATTERN = re.compile(r'\[([^\[\]]*)\]\(([^()]*)\)')
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT_PLAIN)]
-    nodes = split_nodes_delimiter(nodes, '**', TextType.TEXT_BOLD)
-    nodes = split_nodes_delimiter(nodes, '_', TextType.TEXT_ITALIC)
-    nodes = split_nodes_delimiter(nodes, '`', TextType.TEXT_CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # single left-to-right scan; plain text runs between inline tokens
+    nodes = []
+    plain_start = 0
+    position = 0
+    while True:
+        match = INLINE_TOKEN_PATTERN.search(text, position)
+        if match is None:
+            break
+        token = match.group()
+        if token in INLINE_DELIMITERS:
+            end = text.find(token, match.end())
+            if end == -1:
+                raise Exception('Wrong number of delimeters')
+            if plain_start < match.start():
+                nodes.append(TextNode(text[plain_start:match.start()], TextType.TEXT_PLAIN))
+            if match.end() < end:
+                nodes.append(TextNode(text[match.end():end], INLINE_DELIMITERS[token]))
+            position = plain_start = end + len(token)
+            continue
+        if token == '![':
+            reference = IMAGE_PATTERN.match(text, match.start())
+            text_type = TextType.TEXT_IMAGE
+        else:
+            reference = LINK_PATTERN.match(text, match.start())
+            text_type = TextType.TEXT_LINK
+        if reference is None:
+            position = match.end()
+            continue
+        if plain_start < match.start():
+            nodes.append(TextNode(text[plain_start:match.start()], TextType.TEXT_PLAIN))
+        nodes.append(TextNode(reference.group(1), text_type, reference.group(2)))
+        position = plain_start = reference.end()
+    if plain_start < len(text):
+        nodes.append(TextNode(text[plain_start:], TextType.TEXT_PLAIN))
     return nodes
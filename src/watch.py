@@ -0,0 +1,150 @@
+import os, sys, time, struct, select, ctypes, ctypes.util
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')
+
+# editors tend to save in several syscalls; gather everything that lands this close together
+SETTLE_SECONDS = 0.02
+
+class Watcher:
+    def __init__(self, paths):
+        self.paths = [os.path.normpath(path) for path in paths]
+
+    def wait(self, timeout=None):
+        raise NotImplementedError('wait method not implemented')
+
+    def close(self):
+        pass
+
+    def is_watched(self, path):
+        for watched in self.paths:
+            if path == watched or path.startswith(watched + os.sep):
+                return True
+        return False
+
+class InotifyWatcher(Watcher):
+    def __init__(self, paths):
+        super().__init__(paths)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.add_watch_fn = libc.inotify_add_watch
+        self.add_watch_fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                self.add_tree(path)
+            else:
+                # single files are watched through their directory
+                self.add_watch(os.path.dirname(path) or '.')
+
+    def add_watch(self, dir):
+        wd = self.add_watch_fn(self.fd, os.fsencode(dir), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {dir}')
+        self.dirs[wd] = dir
+
+    def add_tree(self, dir):
+        for root, dirs, _ in os.walk(dir):
+            self.add_watch(root)
+
+    def read_events(self):
+        changed = set()
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                raise OverflowError('inotify event queue overflowed')
+            if mask & IN_IGNORED or wd not in self.dirs:
+                self.dirs.pop(wd, None)
+                continue
+            path = os.path.normpath(os.path.join(self.dirs[wd], name))
+            if not self.is_watched(path):
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # a new directory: watch it and report whatever was already put inside
+                self.add_tree(path)
+                for root, _, names in os.walk(path):
+                    changed.update(os.path.join(root, n) for n in names)
+            changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if len(ready) == 0:
+            return []
+        changed = self.read_events()
+        while len(select.select([self.fd], [], [], SETTLE_SECONDS)[0]) != 0:
+            changed.update(self.read_events())
+        return sorted(changed)
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher(Watcher):
+    def __init__(self, paths, interval=0.25):
+        super().__init__(paths)
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for path in self.paths:
+            if os.path.isfile(path):
+                self.stat_into(snapshot, path)
+                continue
+            for root, _, names in os.walk(path):
+                for name in names:
+                    self.stat_into(snapshot, os.path.join(root, name))
+        return snapshot
+
+    def stat_into(self, snapshot, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = set(snapshot) ^ set(self.snapshot)
+            for path, stat in snapshot.items():
+                if path in self.snapshot and self.snapshot[path] != stat:
+                    changed.add(path)
+            self.snapshot = snapshot
+            if len(changed) != 0:
+                return sorted(changed)
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(self.interval)
+
+def create_watcher(paths, poll_interval=0.25):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(paths, poll_interval)
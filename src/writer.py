@@ -0,0 +1,123 @@
+import os
+
+from compress import compressible, remove_stale
+
+COMPARE_CHUNK_BYTES = 1 << 16
+
+def file_matches(path, data):
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, 'rb') as file:
+            return file.read() == data
+    except FileNotFoundError:
+        return False
+
+def files_equal(path, other):
+    try:
+        if os.stat(path).st_size != os.stat(other).st_size:
+            return False
+        with open(path, 'rb') as a, open(other, 'rb') as b:
+            while True:
+                chunk = a.read(COMPARE_CHUNK_BYTES)
+                if chunk != b.read(COMPARE_CHUNK_BYTES):
+                    return False
+                if chunk == b'':
+                    return True
+    except FileNotFoundError:
+        return False
+
+class OutputWriter:
+    # unchanged outputs keep their mtime, so rsync and CDN caches see nothing new
+    def __init__(self, fsync=False, compressor=None):
+        self.fsync = fsync
+        self.compressor = compressor
+        self.dirs = set()
+        self.pending = []
+        self.written = 0
+        self.unchanged = 0
+
+    def makedirs(self, path):
+        if path != '' and path not in self.dirs:
+            os.makedirs(path, exist_ok=True)
+            self.dirs.add(path)
+
+    def tmp_path(self, path):
+        return f'{path}.{os.getpid()}.tmp'
+
+    def write(self, path, data):
+        # returns (size, changed); data is bytes
+        self.makedirs(os.path.dirname(path))
+        if file_matches(path, data):
+            self.unchanged += 1
+            self.compress(path, data, False)
+            return len(data), False
+        tmp_path = self.tmp_path(path)
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        self.record(path)
+        self.compress(path, data, True)
+        return len(data), True
+
+    def write_stream(self, path, write):
+        # for output too large to hold in memory: write(file) fills a temp file, which is compared before it replaces path
+        self.makedirs(os.path.dirname(path))
+        tmp_path = self.tmp_path(path)
+        try:
+            # the same bytes write() would produce, whatever the locale and platform
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+                write(file)
+                size = file.tell()
+            if files_equal(tmp_path, path):
+                os.remove(tmp_path)
+                self.unchanged += 1
+                self.compress(path, None, False)
+                return size, False
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.record(path)
+        self.compress(path, None, True)
+        return size, True
+
+    def record(self, path):
+        # also called for files written by worker processes, so the parent can sync them in one batch
+        self.written += 1
+        if self.fsync:
+            self.pending.append(path)
+
+    def compress(self, path, data=None, changed=True):
+        # also called for outputs written elsewhere (worker processes, static copies, unchanged pages), which are read back
+        if self.compressor is not None:
+            self.compressor.submit(path, data, changed)
+        elif changed and compressible(path):
+            remove_stale(path)
+
+    def sync(self):
+        dirs = set()
+        for path in self.pending:
+            fsync_path(path)
+            dirs.add(os.path.dirname(path) or '.')
+        # the renames only become durable once their directories are synced
+        for path in sorted(dirs):
+            fsync_path(path)
+        synced = len(self.pending)
+        self.pending = []
+        return synced
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+output = OutputWriter()
+
+def configure(fsync=False, compressor=None):
+    global output
+    output = OutputWriter(fsync, compressor)
+    return output